@@ -2,16 +2,60 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
-from typing import List
-from dotenv import load_dotenv, find_dotenv
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Mapping, Optional
+from dotenv import dotenv_values, find_dotenv
 
+_DOTENV_LOCK = threading.Lock()
+_DOTENV_VALUES: Optional[Dict[str, str]] = None
 
+
+def _load_dotenv_once() -> Dict[str, str]:
+    """Locate and parse .env a single time per process (supports parent directories).
+
+    Values are exported to os.environ without overriding existing variables,
+    matching load_dotenv(override=False), so libraries that read the
+    environment directly (e.g. Google credentials) keep working.
+    """
+    global _DOTENV_VALUES
+    if _DOTENV_VALUES is None:
+        with _DOTENV_LOCK:
+            if _DOTENV_VALUES is None:
+                path = find_dotenv()
+                values = {k: v for k, v in dotenv_values(path).items() if v is not None} if path else {}
+                for key, value in values.items():
+                    os.environ.setdefault(key, value)
+                _DOTENV_VALUES = values
+    return _DOTENV_VALUES
+
+
+def _env_str(env: Mapping[str, str], name: str, default: str = "") -> str:
+    return env.get(name, default)
+
+
+def _env_int(env: Mapping[str, str], name: str, default: int) -> int:
+    raw = env.get(name)
+    return default if raw is None else int(raw)
+
+
+def _env_float(env: Mapping[str, str], name: str, default: float) -> float:
+    raw = env.get(name)
+    return default if raw is None else float(raw)
+
+
+def _env_bool(env: Mapping[str, str], name: str, default: bool) -> bool:
+    raw = env.get(name)
+    return default if raw is None else raw.lower() == "true"
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
 class Settings:
     """Runtime configuration loaded from environment variables.
 
     Defaults are suitable for local development. Production should set
     explicit values via environment variables and Secret Manager.
+    Instances are immutable; build one with `Settings.from_env()`.
     """
 
     APP_NAME: str = "Invoice Processing API"
@@ -24,7 +68,9 @@ class Settings:
     MAX_FILES: int
     MAX_SIZE_MB: int
     MAX_PAGES: int
-    ACCEPTED_MIME: List[str]
+    MAX_SIZE_BYTES: int
+    ACCEPTED_MIME: FrozenSet[str]
+    UPLOAD_CONCURRENCY: int
 
     # GCP
     GCS_BUCKET: str
@@ -44,9 +90,14 @@ class Settings:
     OPENROUTER_API_KEY: str
     OPENROUTER_MODEL: str
     LLM_PROMPT_VERSION: str
+    LLM_MAX_OUTPUT_TOKENS: int
+    LLM_MAX_CONCURRENCY: int
+    LLM_MAX_RPS: float
+    LLM_HEDGE_DELAY_S: float
 
     # OCR
     OCR_SYNC_MAX_PAGES: int
+    MIN_OCR_CHARS: int
 
     # Retention
     RETENTION_HOURS: int
@@ -73,69 +124,91 @@ class Settings:
     RL_HEADER_KEY: str
     RL_TZ_OFFSET_MINUTES: int
 
-    def __init__(self) -> None:
-        # Load .env once (supports parent directories)
-        load_dotenv(find_dotenv(), override=False)
-        self.CORS_ORIGINS = self._get_list("CORS_ORIGINS", default="*")
-        self.MAX_FILES = int(os.getenv("MAX_FILES", "10"))
-        self.MAX_SIZE_MB = int(os.getenv("MAX_SIZE_MB", "10"))
-        self.MAX_PAGES = int(os.getenv("MAX_PAGES", "20"))
-        self.ACCEPTED_MIME = ["application/pdf"]
-
-        self.GCS_BUCKET = os.getenv("GCS_BUCKET", "invoice_processing_storage")
-        self.REGION = os.getenv("REGION", "europe-west4")
-        self.FIRESTORE_DATABASE_ID = os.getenv("FIRESTORE_DATABASE_ID", "(default)")
-
-        # Cloud Tasks / GCP project configuration
-        self.GCP_PROJECT = os.getenv("GCP_PROJECT", os.getenv("GOOGLE_CLOUD_PROJECT", ""))
-        self.TASKS_QUEUE = os.getenv("TASKS_QUEUE", "invoice-process-queue")
-        self.TASKS_TARGET_URL = os.getenv("TASKS_TARGET_URL", "")  # e.g., https://<run-url>/api/tasks/process
-        self.TASKS_SERVICE_ACCOUNT_EMAIL = os.getenv("TASKS_SERVICE_ACCOUNT_EMAIL", "")
-        self.TASKS_EMULATE = os.getenv("TASKS_EMULATE", "true").lower() == "true"
-
-        # LLM
-        self.GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-        self.GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-        self.OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
-        self.OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-3.3-70b-instruct:free")
-        self.LLM_PROMPT_VERSION = os.getenv("LLM_PROMPT_VERSION", "v1")
-
-        # OCR
-        self.OCR_SYNC_MAX_PAGES = int(os.getenv("OCR_SYNC_MAX_PAGES", "2"))
-
-        # Retention
-        self.RETENTION_HOURS = int(os.getenv("RETENTION_HOURS", "24"))
-        self.RETENTION_LOOP_ENABLE = os.getenv("RETENTION_LOOP_ENABLE", "true").lower() == "true"
-        self.RETENTION_LOOP_INTERVAL_MIN = int(os.getenv("RETENTION_LOOP_INTERVAL_MIN", "60"))
-
-        # Locks
-        self.LOCK_STALE_MINUTES = int(os.getenv("LOCK_STALE_MINUTES", "15"))
-
-        # Preprocessing (sanitizer path only)
-        self.PREPROCESS_MAX_CHARS = int(os.getenv("PREPROCESS_MAX_CHARS", "20000"))
-        self.ZONE_STRIP_TOP = int(os.getenv("ZONE_STRIP_TOP", "5"))
-        self.ZONE_STRIP_BOTTOM = int(os.getenv("ZONE_STRIP_BOTTOM", "5"))
-
-        # Rate limiting / quotas (defaults are conservative; override in env)
-        self.RL_ENABLED = os.getenv("RL_ENABLED", "true").lower() == "true"
-        self.RL_JOBS_PER_MIN_CAP = int(os.getenv("RL_JOBS_PER_MIN_CAP", "5"))
-        self.RL_FILES_PER_MIN_CAP = int(os.getenv("RL_FILES_PER_MIN_CAP", "20"))
-        self.RL_RETRY_PER_MIN_CAP = int(os.getenv("RL_RETRY_PER_MIN_CAP", "5"))
-        self.RL_DAILY_PER_SESSION = int(os.getenv("RL_DAILY_PER_SESSION", "50"))
-        self.RL_DAILY_GLOBAL = int(os.getenv("RL_DAILY_GLOBAL", "250"))
-        self.RL_USE_IP_FALLBACK = os.getenv("RL_USE_IP_FALLBACK", "true").lower() == "true"
-        self.RL_IP_PER_MIN_CAP = int(os.getenv("RL_IP_PER_MIN_CAP", "60"))
-        self.RL_HEADER_KEY = os.getenv("RL_HEADER_KEY", "X-Session-Id")
-        # CET fixed +1 minute offset (ignore DST) unless overridden
-        self.RL_TZ_OFFSET_MINUTES = int(os.getenv("RL_TZ_OFFSET_MINUTES", "60"))
+    @classmethod
+    def from_env(cls) -> "Settings":
+        # Load .env once per process; later constructions reuse the parsed values
+        _load_dotenv_once()
+        # Snapshot the environment once and resolve every field against it
+        env = dict(os.environ)
+
+        max_size_mb = _env_int(env, "MAX_SIZE_MB", 10)
+        # Clamp to a reasonable range to avoid provider errors
+        try:
+            max_output_tokens = max(256, min(8192, _env_int(env, "LLM_MAX_OUTPUT_TOKENS", 4096)))
+        except ValueError:
+            max_output_tokens = 4096
+
+        return cls(
+            CORS_ORIGINS=cls._get_list(env, "CORS_ORIGINS", default="*"),
+            MAX_FILES=_env_int(env, "MAX_FILES", 10),
+            MAX_SIZE_MB=max_size_mb,
+            MAX_PAGES=_env_int(env, "MAX_PAGES", 20),
+            # Derived once here so per-file checks don't recompute it
+            MAX_SIZE_BYTES=max_size_mb * 1024 * 1024,
+            ACCEPTED_MIME=frozenset({"application/pdf"}),
+            # Files of one upload request validated/stored in parallel
+            UPLOAD_CONCURRENCY=max(1, _env_int(env, "UPLOAD_CONCURRENCY", 4)),
+            GCS_BUCKET=_env_str(env, "GCS_BUCKET", "invoice_processing_storage"),
+            REGION=_env_str(env, "REGION", "europe-west4"),
+            FIRESTORE_DATABASE_ID=_env_str(env, "FIRESTORE_DATABASE_ID", "(default)"),
+            # Cloud Tasks / GCP project configuration
+            GCP_PROJECT=_env_str(env, "GCP_PROJECT", _env_str(env, "GOOGLE_CLOUD_PROJECT")),
+            TASKS_QUEUE=_env_str(env, "TASKS_QUEUE", "invoice-process-queue"),
+            TASKS_TARGET_URL=_env_str(env, "TASKS_TARGET_URL", ""),  # e.g., https://<run-url>/api/tasks/process
+            TASKS_SERVICE_ACCOUNT_EMAIL=_env_str(env, "TASKS_SERVICE_ACCOUNT_EMAIL", ""),
+            TASKS_EMULATE=_env_bool(env, "TASKS_EMULATE", True),
+            # LLM
+            GEMINI_API_KEY=_env_str(env, "GEMINI_API_KEY", ""),
+            GEMINI_MODEL=_env_str(env, "GEMINI_MODEL", "gemini-2.5-flash"),
+            OPENROUTER_API_KEY=_env_str(env, "OPENROUTER_API_KEY", ""),
+            OPENROUTER_MODEL=_env_str(env, "OPENROUTER_MODEL", "meta-llama/llama-3.3-70b-instruct:free"),
+            LLM_PROMPT_VERSION=_env_str(env, "LLM_PROMPT_VERSION", "v1"),
+            LLM_MAX_OUTPUT_TOKENS=max_output_tokens,
+            # Per-process caps on upstream LLM traffic; LLM_MAX_RPS <= 0 disables spacing
+            LLM_MAX_CONCURRENCY=max(1, _env_int(env, "LLM_MAX_CONCURRENCY", 4)),
+            LLM_MAX_RPS=_env_float(env, "LLM_MAX_RPS", 2.0),
+            # Start the OpenRouter fallback if Gemini hasn't answered after this long; <= 0 disables
+            LLM_HEDGE_DELAY_S=_env_float(env, "LLM_HEDGE_DELAY_S", 20.0),
+            # OCR
+            OCR_SYNC_MAX_PAGES=_env_int(env, "OCR_SYNC_MAX_PAGES", 2),
+            # Below this many sanitized characters the LLM is not called
+            MIN_OCR_CHARS=_env_int(env, "MIN_OCR_CHARS", 50),
+            # Retention
+            RETENTION_HOURS=_env_int(env, "RETENTION_HOURS", 24),
+            RETENTION_LOOP_ENABLE=_env_bool(env, "RETENTION_LOOP_ENABLE", True),
+            RETENTION_LOOP_INTERVAL_MIN=_env_int(env, "RETENTION_LOOP_INTERVAL_MIN", 60),
+            # Locks
+            LOCK_STALE_MINUTES=_env_int(env, "LOCK_STALE_MINUTES", 15),
+            # Preprocessing (sanitizer path only)
+            PREPROCESS_MAX_CHARS=_env_int(env, "PREPROCESS_MAX_CHARS", 20000),
+            ZONE_STRIP_TOP=_env_int(env, "ZONE_STRIP_TOP", 5),
+            ZONE_STRIP_BOTTOM=_env_int(env, "ZONE_STRIP_BOTTOM", 5),
+            # Rate limiting / quotas (defaults are conservative; override in env)
+            RL_ENABLED=_env_bool(env, "RL_ENABLED", True),
+            RL_JOBS_PER_MIN_CAP=_env_int(env, "RL_JOBS_PER_MIN_CAP", 5),
+            RL_FILES_PER_MIN_CAP=_env_int(env, "RL_FILES_PER_MIN_CAP", 20),
+            RL_RETRY_PER_MIN_CAP=_env_int(env, "RL_RETRY_PER_MIN_CAP", 5),
+            RL_DAILY_PER_SESSION=_env_int(env, "RL_DAILY_PER_SESSION", 50),
+            RL_DAILY_GLOBAL=_env_int(env, "RL_DAILY_GLOBAL", 250),
+            RL_USE_IP_FALLBACK=_env_bool(env, "RL_USE_IP_FALLBACK", True),
+            RL_IP_PER_MIN_CAP=_env_int(env, "RL_IP_PER_MIN_CAP", 60),
+            RL_HEADER_KEY=_env_str(env, "RL_HEADER_KEY", "X-Session-Id"),
+            # CET fixed +1 minute offset (ignore DST) unless overridden
+            RL_TZ_OFFSET_MINUTES=_env_int(env, "RL_TZ_OFFSET_MINUTES", 60),
+        )
 
     @staticmethod
-    def _get_list(name: str, default: str = "") -> List[str]:
-        raw = os.getenv(name, default)
+    def _get_list(env: Mapping[str, str], name: str, default: str = "") -> List[str]:
+        raw = env.get(name, default)
         return [item.strip() for item in raw.split(",") if item.strip()] or ["*"]
 
 
-@lru_cache(maxsize=1)
+_SETTINGS: Optional[Settings] = None
+
+
 def get_settings() -> Settings:
-    """Return a cached Settings instance."""
-    return Settings()
+    """Return the process-wide Settings instance (built on first use)."""
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = Settings.from_env()
+    return _SETTINGS
@@ -1,14 +1,27 @@
 """FastAPI dependencies (e.g., session header parsing)."""
 from __future__ import annotations
 
-import re
+import hashlib
+import time
+from functools import lru_cache
 from fastapi import Header, HTTPException
-from typing import Annotated
-from google.oauth2 import id_token
-from google.auth.transport.requests import Request
+from typing import TYPE_CHECKING, Annotated, Dict, Optional, Tuple
 from .config import get_settings
 
-_SESSION_RE = re.compile(r"^[0-9a-fA-F-]{36}$")
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from google.auth.transport.requests import Request
+
+    from .services.firestore import FirestoreService
+    from .services.orchestration.job_service import JobOrchestrationService
+    from .services.orchestration.task_pipeline import TaskPipelineService
+
+# google.oauth2 / google.auth.transport.requests pull in requests, urllib3 and
+# cryptography; they are imported on first real verification so that
+# TASKS_EMULATE deployments and cold starts never pay for them.
+
+_SESSION_LEN = 36
+# Characters allowed in a session ID; deleting them must leave nothing behind
+_SESSION_CHARS = b"0123456789abcdefABCDEF-"
 
 
 def get_session_id(x_session_id: str | None = Header(default=None, alias="X-Session-Id")) -> str:
@@ -17,11 +30,66 @@ def get_session_id(x_session_id: str | None = Header(default=None, alias="X-Sess
     The frontend should generate a UUID v4 per page load and send it with every request.
     We accept any 36-char UUID pattern and treat missing/invalid as 400.
     """
-    if not x_session_id or not _SESSION_RE.match(x_session_id):
+    if (
+        not x_session_id
+        or len(x_session_id) != _SESSION_LEN
+        or not x_session_id.isascii()
+        or x_session_id.encode("ascii").translate(None, _SESSION_CHARS)
+    ):
         raise HTTPException(status_code=400, detail="Missing or invalid X-Session-Id header")
     return x_session_id
 
 
+# Verified OIDC claims keyed by token digest -> (expires_at_epoch, claims)
+_OIDC_CACHE_TTL_S = 60
+_OIDC_CACHE_MAX = 256
+_oidc_cache: Dict[str, Tuple[float, dict]] = {}
+_oidc_request: Optional[Request] = None
+
+
+def _get_oidc_request() -> Request:
+    """Return a process-wide auth transport with a pooled HTTPS session.
+
+    Reusing one session keeps the connection to Google's cert endpoint warm
+    instead of opening a new one for every task invocation.
+    """
+    global _oidc_request
+    if _oidc_request is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from google.auth.transport.requests import Request
+
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        _oidc_request = Request(session=session)
+    return _oidc_request
+
+
+def _verify_cached(token: str, audience: str) -> dict:
+    """Verify an OIDC token, memoizing the decoded claims for a short TTL.
+
+    Entries never outlive the token's own `exp`, so a cached hit is exactly
+    as valid as a fresh verification.
+    """
+    now = time.time()
+    key = hashlib.sha256(f"{audience}|{token}".encode()).hexdigest()
+    hit = _oidc_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+
+    from google.oauth2 import id_token
+
+    decoded = id_token.verify_oauth2_token(token, _get_oidc_request(), audience)
+    expires_at = min(now + _OIDC_CACHE_TTL_S, float(decoded.get("exp", now)))
+    if len(_oidc_cache) >= _OIDC_CACHE_MAX:
+        for k in [k for k, (exp, _) in _oidc_cache.items() if exp <= now]:
+            _oidc_cache.pop(k, None)
+        if len(_oidc_cache) >= _OIDC_CACHE_MAX:
+            _oidc_cache.clear()
+    _oidc_cache[key] = (expires_at, decoded)
+    return decoded
+
+
 async def verify_oidc_token(
     authorization: Annotated[str | None, Header(alias="Authorization")] = None,
 ) -> dict:
@@ -34,9 +102,14 @@ async def verify_oidc_token(
     - Enforce the caller's email equals TASKS_SERVICE_ACCOUNT_EMAIL.
     """
     settings = get_settings()
+    emulate, audience, expected_sa = (
+        settings.TASKS_EMULATE,
+        settings.TASKS_TARGET_URL,
+        settings.TASKS_SERVICE_ACCOUNT_EMAIL,
+    )
 
     # Bypass in emulation mode to simplify local development
-    if settings.TASKS_EMULATE:
+    if emulate:
         return {"email": "emulated-task@example.com"}
 
     if not authorization:
@@ -50,14 +123,10 @@ async def verify_oidc_token(
         raise HTTPException(status_code=401, detail="Invalid Authorization header format")
 
     try:
-        decoded = id_token.verify_oauth2_token(
-            token,
-            Request(),
-            settings.TASKS_TARGET_URL,
-        )
+        decoded = _verify_cached(token, audience)
 
         caller = decoded.get("email")
-        if not caller or caller != settings.TASKS_SERVICE_ACCOUNT_EMAIL:
+        if not caller or caller != expected_sa:
             raise HTTPException(status_code=403, detail="Token is from an unauthorized service account")
 
         return decoded
@@ -65,3 +134,29 @@ async def verify_oidc_token(
         raise
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=401, detail=f"Invalid OIDC token: {exc}")
+
+
+# Process-wide service singletons for `Depends(...)`. Each wraps Google API
+# clients (gRPC channels, credentials, HTTP pools), so they are built on first
+# use and then shared by every request instead of being rebuilt per call.
+
+
+@lru_cache(maxsize=1)
+def get_firestore_service() -> "FirestoreService":
+    from .services.firestore import FirestoreService
+
+    return FirestoreService()
+
+
+@lru_cache(maxsize=1)
+def get_job_service() -> "JobOrchestrationService":
+    from .services.orchestration.job_service import JobOrchestrationService
+
+    return JobOrchestrationService()
+
+
+@lru_cache(maxsize=1)
+def get_task_pipeline() -> "TaskPipelineService":
+    from .services.orchestration.task_pipeline import TaskPipelineService
+
+    return TaskPipelineService()
@@ -2,33 +2,55 @@ from __future__ import annotations
 
 """Domain-specific exceptions for service and orchestration layers.
 
-Routers should catch these and translate them to appropriate HTTP responses.
+All exceptions derive from `DomainError`, which carries the HTTP status it
+maps to. `main.py` registers a single handler for `DomainError`, so routers
+do not need per-type except clauses.
 """
 
 
-class FileValidationError(Exception):
+class DomainError(Exception):
+    """Base class for domain errors; `status_code` is the HTTP mapping."""
+
+    status_code: int = 500
+
+
+class FileValidationError(DomainError):
     """Invalid file input (mime, empty, unreadable, pages exceeded, etc.)."""
 
+    status_code = 400
 
-class PayloadTooLargeError(Exception):
+
+class PayloadTooLargeError(DomainError):
     """Payload exceeds configured size limits (maps to HTTP 413)."""
 
+    status_code = 413
+
 
-class RateLimitError(Exception):
+class RateLimitError(DomainError):
     """Rate limit exceeded (maps to HTTP 429)."""
 
+    status_code = 429
 
-class NotFoundError(Exception):
+
+class NotFoundError(DomainError):
     """Resource not found or does not belong to the caller (maps to HTTP 404)."""
 
+    status_code = 404
+
 
-class ConflictError(Exception):
+class ConflictError(DomainError):
     """Resource conflict (e.g., missing original blob for retry) (maps to HTTP 409)."""
 
+    status_code = 409
+
 
-class LockAcquisitionError(Exception):
+class LockAcquisitionError(DomainError):
     """Unable to acquire processing lock (generally not an HTTP error; used internally)."""
 
+    status_code = 409
 
-class ExternalServiceError(Exception):
+
+class ExternalServiceError(DomainError):
     """Upstream provider or storage error (maps to HTTP 503)."""
+
+    status_code = 503
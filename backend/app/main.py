@@ -1,17 +1,23 @@
 """
 Main FastAPI application for the Invoice Processing backend.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import asyncio
 import logging
+import re
 from contextlib import asynccontextmanager
 
 from .config import get_settings
+from .deps import get_firestore_service
+from .exceptions import DomainError
 from .routers.health import router as health_router
 from .routers.config import router as config_router
 from .routers.jobs import router as jobs_router
 from .routers.tasks import router as tasks_router
+from .services.llm import aclose_http_client
 
 
 settings = get_settings()
@@ -29,6 +35,7 @@ async def lifespan(app: FastAPI):
         t = getattr(app.state, "_retention_task", None)
         if t and not t.done():
             t.cancel()
+        await aclose_http_client()
 
 
 app = FastAPI(
@@ -37,22 +44,44 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# CORS configuration
+def _cors_origin_regex(origins: list[str]) -> str:
+    """Collapse the configured origins into a single pattern for CORSMiddleware.
+
+    `*` becomes `.*`, which makes Starlette echo the caller's origin (valid
+    together with allow_credentials) instead of sending a literal wildcard.
+    """
+    if "*" in origins:
+        return ".*"
+    return "|".join(re.escape(o) for o in origins)
+
+
+# CORS configuration: one compiled fullmatch instead of a scan over the origin list
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[o.strip() for o in settings.CORS_ORIGINS],
+    allow_origins=[],
+    allow_origin_regex=_cors_origin_regex(settings.CORS_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Routers
-app.include_router(health_router, prefix=settings.API_PREFIX)
-app.include_router(config_router, prefix=settings.API_PREFIX)
-app.include_router(jobs_router, prefix=settings.API_PREFIX)
-app.include_router(tasks_router, prefix=settings.API_PREFIX)
+@app.exception_handler(DomainError)
+async def domain_error_handler(request: Request, exc: DomainError) -> ORJSONResponse:
+    """Translate service-layer domain errors to their HTTP status."""
+    return ORJSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+
+# Compress larger payloads (job lists, results, CSV exports)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Routers (all mounted under the API prefix)
+ROUTERS = (health_router, config_router, jobs_router, tasks_router)
+api_prefix = settings.API_PREFIX
+for router in ROUTERS:
+    app.include_router(router, prefix=api_prefix)
 
 
 @app.get("/", tags=["root"])
@@ -62,15 +91,16 @@ async def root() -> dict:
 
 
 async def _retention_loop() -> None:
-    from .services.firestore import FirestoreService
-
+    hours = settings.RETENTION_HOURS
+    sleep_s = settings.RETENTION_LOOP_INTERVAL_MIN * 60
     while True:
         try:
-            deleted = FirestoreService().delete_stale_jobs(settings.RETENTION_HOURS)
+            # Firestore client is synchronous; keep the sweep off the event loop
+            deleted = await asyncio.to_thread(get_firestore_service().delete_stale_jobs, hours)
             if deleted:
                 logger.info("Retention: deleted %d stale jobs", deleted)
         except Exception as exc:  # noqa: BLE001
             logger.warning("Retention loop error: %s", exc)
-        await asyncio.sleep(settings.RETENTION_LOOP_INTERVAL_MIN * 60)
+        await asyncio.sleep(sleep_s)
 
 
@@ -1,12 +1,94 @@
 """Pydantic models for API requests and responses."""
 from __future__ import annotations
 
-from datetime import date, datetime
-from typing import List, Optional
 import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterator, List, Optional
 from pydantic import BaseModel, Field
 
 
+
+# Everything except ASCII digits, ',', '.' and '-' is dropped from numeric strings
+_NUM_CLEAN_RE = re.compile(r"[^0-9,\.\-]")
+# Comma-decimal numbers: drop thousands dots and turn the comma into a dot in one pass
+_COMMA_DECIMAL = str.maketrans({".": None, ",": "."})
+# Column order of the session CSV export; Invoice.to_csv_rows yields rows in this order
+CSV_COLUMNS = (
+    "invoiceNumber",
+    "invoiceDate",
+    "vendorName",
+    "currency",
+    "subtotal",
+    "tax",
+    "total",
+    "dueDate",
+    "lineItemIndex",
+    "description",
+    "quantity",
+    "unitPrice",
+    "lineTotal",
+    "confidenceScore",
+    "filename",
+)
+# Fallback formats for dates the fixed-width fast path in Invoice._parse_date skips
+_DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y")
+
+
+def _parse_number(val) -> float:
+    """Parse numbers from mixed-locale strings.
+
+    Accepts strings like "€ 1.234,56", "1,234.56", "1234.56", "2x", "2 pcs".
+    Strategy:
+    - Strip currency symbols and letters, keep digits, separators (., ,), minus, and parentheses.
+    - Detect decimal separator by the rightmost of ',' or '.'. Treat the other as thousand sep and remove.
+    - Support negatives in parentheses, e.g., (123.45) -> -123.45.
+    """
+    if isinstance(val, (int, float)):
+        return float(val)
+    if val is None:
+        raise ValueError("empty number")
+    return _parse_number_str(str(val).strip())
+
+
+@lru_cache(maxsize=2048)
+def _parse_number_str(s: str) -> float:
+    """String half of ``_parse_number``; memoized since invoices repeat tokens like "0,00"."""
+    if not s:
+        raise ValueError("empty number")
+    # Plain integers ("2", "150") need no cleaning or separator detection
+    if s.isdigit() and s.isascii():
+        return float(s)
+    # Parentheses negative
+    neg = False
+    if s.startswith("(") and s.endswith(")"):
+        neg = True
+        s = s[1:-1]
+    # Remove all but digits, separators, minus
+    s = _NUM_CLEAN_RE.sub("", s)
+    # If both separators appear, choose rightmost as decimal
+    last_comma = s.rfind(',')
+    last_dot = s.rfind('.')
+    if last_comma == -1 and last_dot == -1:
+        # Only digits and minus signs are left; nothing at all means no digits were given
+        num = float(s) if s else 0.0
+    else:
+        if last_comma > last_dot:
+            # comma decimal; remove all dots (thousands), replace comma with dot
+            num = float(s.translate(_COMMA_DECIMAL))
+        else:
+            # dot decimal; remove all commas (thousands)
+            num = float(s.replace(',', ''))
+    if neg:
+        num = -num
+    return num
+
+
+def _is_clean_amount(val) -> bool:
+    """True for a real (non-bool) int/float that already satisfies ``ge=0``; NaN fails."""
+    return type(val) in (int, float) and val >= 0
+
+
 class Limits(BaseModel):
     """Runtime limits exposed to the frontend."""
 
@@ -61,15 +143,78 @@ class Invoice(BaseModel):
     def _parse_date(value: str | date) -> date:
         if isinstance(value, date):
             return value
+        if not isinstance(value, str):
+            raise ValueError("Unrecognized date format; use dd-mm-yyyy or yyyy-mm-dd")
+        s = value.strip()
+        # Fast path: zero-padded yyyy-mm-dd or dd?mm?yyyy picked by separator position
+        if len(s) == 10 and s.isascii():
+            if s[4] == "-" == s[7]:
+                y, m, d = s[:4], s[5:7], s[8:]
+            elif s[2] == s[5] and s[2] in "-/.":
+                y, m, d = s[6:], s[3:5], s[:2]
+            else:
+                y = m = d = ""
+            if y.isdigit() and m.isdigit() and d.isdigit():
+                try:
+                    return date(int(y), int(m), int(d))
+                except ValueError:
+                    pass
         # Try EU first, then ISO
-        for fmt in ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y"):
+        for fmt in _DATE_FORMATS:
             try:
-                return datetime.strptime(value.strip(), fmt).date()
+                return datetime.strptime(s, fmt).date()
             except Exception:
                 continue
         # Pydantic will handle fallback if this raises
         raise ValueError("Unrecognized date format; use dd-mm-yyyy or yyyy-mm-dd")
 
+    @classmethod
+    def _construct_if_clean(cls, data: dict) -> Optional["Invoice"]:
+        """Build the invoice with model_construct when every field is already canonical.
+
+        Expects dates and currency to be normalized already. Returns None as soon
+        as any value would need the tolerant sanitation path (string numbers,
+        negative or missing amounts, blank descriptions, unexpected types).
+        """
+        for k in ("subtotal", "tax", "total"):
+            if not _is_clean_amount(data.get(k)):
+                return None
+        if not isinstance(data.get("invoiceNumber"), str) or not isinstance(data.get("vendorName"), str):
+            return None
+        if type(data.get("invoiceDate")) is not date:
+            return None
+        due = data.get("dueDate")
+        if due is not None and type(due) is not date:
+            return None
+        notes = data.get("notes")
+        if notes is not None and not isinstance(notes, str):
+            return None
+        raw_items = data.get("lineItems") or []
+        if type(raw_items) is not list:
+            return None
+        items: List[InvoiceLineItem] = []
+        for it in raw_items:
+            if type(it) is not dict:
+                return None
+            desc = it.get("description")
+            if not isinstance(desc, str):
+                return None
+            desc = desc.strip()
+            q, up, lt = it.get("quantity"), it.get("unitPrice"), it.get("lineTotal")
+            if not desc or not (_is_clean_amount(q) and _is_clean_amount(up) and _is_clean_amount(lt)):
+                return None
+            items.append(
+                InvoiceLineItem.model_construct(
+                    description=desc, quantity=float(q), unitPrice=float(up), lineTotal=float(lt)
+                )
+            )
+        fields = {k: data[k] for k in cls.model_fields if k in data}
+        fields["subtotal"] = float(data["subtotal"])
+        fields["tax"] = float(data["tax"])
+        fields["total"] = float(data["total"])
+        fields["lineItems"] = items
+        return cls.model_construct(**fields)
+
     @classmethod
     def model_validate_jsonish(cls, data: dict) -> "Invoice":
         # Normalize dates if provided as strings
@@ -83,45 +228,11 @@ class Invoice(BaseModel):
         # Coerce currency
         cur = (data.get("currency") or "EUR").upper()
         data["currency"] = cur
-        
-        def _parse_number(val) -> float:
-            """Parse numbers from mixed-locale strings.
-
-            Accepts strings like "€ 1.234,56", "1,234.56", "1234.56", "2x", "2 pcs".
-            Strategy:
-            - Strip currency symbols and letters, keep digits, separators (., ,), minus, and parentheses.
-            - Detect decimal separator by the rightmost of ',' or '.'. Treat the other as thousand sep and remove.
-            - Support negatives in parentheses, e.g., (123.45) -> -123.45.
-            """
-            if val is None:
-                raise ValueError("empty number")
-            if isinstance(val, (int, float)):
-                return float(val)
-            s = str(val).strip()
-            if not s:
-                raise ValueError("empty number")
-            # Parentheses negative
-            neg = False
-            if s.startswith("(") and s.endswith(")"):
-                neg = True
-                s = s[1:-1]
-            # Remove all but digits, separators, minus
-            s = re.sub(r"[^0-9,\.\-]", "", s)
-            # If both separators appear, choose rightmost as decimal
-            last_comma = s.rfind(',')
-            last_dot = s.rfind('.')
-            if last_comma == -1 and last_dot == -1:
-                num = float(s or 0)
-            else:
-                if last_comma > last_dot:
-                    # comma decimal; remove all dots (thousands), replace comma with dot
-                    num = float(s.replace('.', '').replace(',', '.'))
-                else:
-                    # dot decimal; remove all commas (thousands)
-                    num = float(s.replace(',', ''))
-            if neg:
-                num = -num
-            return num
+
+        # Well-formed LLM output needs no sanitation or re-validation
+        clean = cls._construct_if_clean(data)
+        if clean is not None:
+            return clean
 
         # Ensure numeric fields are floats (tolerant parsing)
         for k in ("subtotal", "tax", "total"):
@@ -133,7 +244,7 @@ class Invoice(BaseModel):
 
         # Sanitize line items: parse numbers, infer missing lineTotal, drop invalid/negative items
         raw_items = data.get("lineItems") or []
-        clean_items: List[dict] = []
+        clean_items: List[InvoiceLineItem | dict] = []
         for it in raw_items:
             # Require description
             desc = (it.get("description") or "").strip()
@@ -155,38 +266,52 @@ class Invoice(BaseModel):
                     continue
                 if q < 0 or up < 0 or lt < 0:
                     continue
-                clean_items.append({
+                item = {
                     "description": desc,
                     "quantity": float(q),
                     "unitPrice": float(up),
                     "lineTotal": float(lt),
-                })
+                }
+                # Items checked here need no second pass through the validator; NaN
+                # slips past the negativity check, so leave those for it to reject
+                if q >= 0 and up >= 0 and lt >= 0:
+                    clean_items.append(InvoiceLineItem.model_construct(**item))
+                else:
+                    clean_items.append(item)
             except Exception:
                 continue
         data["lineItems"] = clean_items
 
         return cls.model_validate(data)
 
-    def to_csv_rows(self, filename: str, confidence: float | None = None) -> List[dict]:
-        rows: List[dict] = []
+    @classmethod
+    def from_trusted(cls, data: dict) -> "Invoice":
+        """Rebuild an invoice the pipeline already validated and dumped (``resultJson``).
+
+        Skips validation entirely; do not use on LLM output or client input.
+        """
+        fields = dict(data)
+        for k in ("invoiceDate", "dueDate"):
+            if isinstance(fields.get(k), str):
+                fields[k] = date.fromisoformat(fields[k])
+        fields["lineItems"] = [
+            InvoiceLineItem.model_construct(**li) for li in fields.get("lineItems") or ()
+        ]
+        return cls.model_construct(**fields)
+
+    def to_csv_rows(self, filename: str, confidence: float | None = None) -> Iterator[tuple]:
+        """Yield one row per line item, ordered as ``CSV_COLUMNS``."""
+        # Invoice-level columns are identical on every row; format them once
+        head = (
+            self.invoiceNumber,
+            self.invoiceDate.isoformat(),
+            self.vendorName,
+            self.currency,
+            self.subtotal,
+            self.tax,
+            self.total,
+            self.dueDate.isoformat() if self.dueDate else "",
+        )
+        tail = (confidence if confidence is not None else "", filename)
         for idx, li in enumerate(self.lineItems, start=1):
-            rows.append(
-                {
-                    "invoiceNumber": self.invoiceNumber,
-                    "invoiceDate": self.invoiceDate.isoformat(),
-                    "vendorName": self.vendorName,
-                    "currency": self.currency,
-                    "subtotal": self.subtotal,
-                    "tax": self.tax,
-                    "total": self.total,
-                    "dueDate": self.dueDate.isoformat() if self.dueDate else "",
-                    "lineItemIndex": idx,
-                    "description": li.description,
-                    "quantity": li.quantity,
-                    "unitPrice": li.unitPrice,
-                    "lineTotal": li.lineTotal,
-                    "confidenceScore": confidence if confidence is not None else "",
-                    "filename": filename,
-                }
-            )
-        return rows
+            yield head + (idx, li.description, li.quantity, li.unitPrice, li.lineTotal) + tail
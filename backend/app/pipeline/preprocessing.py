@@ -3,6 +3,17 @@ from __future__ import annotations
 import re
 import unicodedata
 
+# Compiled once per process; sanitize_for_llm runs for every job
+_WS_RE = re.compile(r"[ \t\f\v]+")
+# Applied in this order, one pass each: a removal can expose a word boundary the
+# next pattern needs (e.g. "ConfidentialInvoice scanned by ..."), so fusing them
+# into one alternation changes the output
+_NOISE_RES = (
+    re.compile(r"\bPage \d+ of \d+\b", re.IGNORECASE),
+    re.compile(r"Invoice scanned by.*", re.IGNORECASE),
+    re.compile(r"\bConfidential\b", re.IGNORECASE),
+)
+
 
 def sanitize_for_llm(text: str, max_chars: int, strip_top: int, strip_bottom: int) -> str:
     """Lightweight sanitizer that preserves line breaks for the LLM.
@@ -10,8 +21,14 @@ def sanitize_for_llm(text: str, max_chars: int, strip_top: int, strip_bottom: in
     Steps:
     1) Ultra-light zoning: optionally drop top/bottom lines to remove boilerplate.
     2) Line-wise normalization and expanded noise removal (keeps newlines).
-    3) Smart truncation at a newline boundary when possible.
+    3) Smart truncation at a newline boundary when possible, decided while the
+       lines are collected so nothing past the limit is normalized or joined.
     """
+    # NFKC once over the whole text rather than per line; ASCII text is already
+    # NFKC-normal and isascii() is O(1) on CPython strings
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+
     # 1) Ultra-Light Zoning
     lines = text.splitlines()
     if strip_top < 0:
@@ -22,29 +39,27 @@ def sanitize_for_llm(text: str, max_chars: int, strip_top: int, strip_bottom: in
         end_idx = len(lines) - strip_bottom if strip_bottom > 0 else len(lines)
         lines = lines[strip_top:end_idx]
 
-    # 2) Line-wise normalization and noise removal
+    # 2) Line-wise normalization and noise removal in a single pass; the noise
+    # patterns never span a newline, so they can be applied per line.
+    max_chars = max(1000, int(max_chars))
     norm_lines = []
+    append = norm_lines.append
+    ws_sub = _WS_RE.sub
+    page_sub, stamp_sub, conf_sub = (pat.sub for pat in _NOISE_RES)
+    size = -1  # length of "\n".join(norm_lines)
     for ln in lines:
-        ln = unicodedata.normalize("NFKC", ln)
-        ln = re.sub(r"[ \t\f\v]+", " ", ln).strip()
-        if ln:
-            norm_lines.append(ln)
-    text2 = "\n".join(norm_lines)
-
-    noise_patterns = [
-        re.compile(r"\bPage \d+ of \d+\b", re.IGNORECASE),
-        re.compile(r"Invoice scanned by.*", re.IGNORECASE),
-        re.compile(r"\bConfidential\b", re.IGNORECASE),
-    ]
-    for pat in noise_patterns:
-        text2 = pat.sub("", text2)
-    # Trim any empty lines introduced by removals
-    text2 = "\n".join([seg.strip() for seg in text2.splitlines() if seg.strip()])
-
-    # 3) Smart truncation
-    max_chars = max(1000, int(max_chars))
-    if len(text2) > max_chars:
-        cut = text2.rfind("\n", 0, max_chars)
-        text2 = text2[:cut] if cut != -1 else text2[:max_chars]
+        ln = conf_sub("", stamp_sub("", page_sub("", ws_sub(" ", ln)))).strip()
+        if not ln:
+            continue
+        size += len(ln) + 1
+        if size > max_chars:
+            # 3) Smart truncation: keep the whole lines whose trailing newline falls
+            # before the limit; a first line that is already too long is cut hard.
+            if not norm_lines:
+                append(ln[:max_chars])
+            elif size - len(ln) - 1 == max_chars and len(norm_lines) > 1:
+                norm_lines.pop()
+            break
+        append(ln)
 
-    return text2
+    return "\n".join(norm_lines)
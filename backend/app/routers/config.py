@@ -7,14 +7,17 @@ from ..config import get_settings
 
 router = APIRouter(tags=["config"])
 
+# Settings are immutable for the life of the process, so build the payload once
+_settings = get_settings()
+_CONFIG = {
+    "maxFiles": _settings.MAX_FILES,
+    "maxSizeMb": _settings.MAX_SIZE_MB,
+    "maxPages": _settings.MAX_PAGES,
+    "acceptedMime": sorted(_settings.ACCEPTED_MIME),
+}
+
 
 @router.get("/config")
 async def get_config() -> dict:
     """Expose non-sensitive runtime limits and accepted MIME types."""
-    settings = get_settings()
-    return {
-        "maxFiles": settings.MAX_FILES,
-        "maxSizeMb": settings.MAX_SIZE_MB,
-        "maxPages": settings.MAX_PAGES,
-        "acceptedMime": settings.ACCEPTED_MIME,
-    }
+    return _CONFIG
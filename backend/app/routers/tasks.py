@@ -10,7 +10,7 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from ..deps import verify_oidc_token
+from ..deps import get_task_pipeline, verify_oidc_token
 from ..services.orchestration.task_pipeline import TaskPipelineService
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])  # mounted under /api
@@ -21,6 +21,7 @@ logger = logging.getLogger(__name__)
 async def process_task(
     payload: Dict[str, Any],
     decoded_token: dict = Depends(verify_oidc_token),
+    pipeline: TaskPipelineService = Depends(get_task_pipeline),
 ) -> Dict[str, Any]:
     """Process a job: expects JSON { jobId, sessionId }.
 
@@ -32,5 +33,4 @@ async def process_task(
     if not job_id or not session_id:
         raise HTTPException(status_code=400, detail="Missing jobId or sessionId")
 
-    pipeline = TaskPipelineService()
     return await pipeline.process_invoice_job(job_id, session_id)
@@ -2,41 +2,41 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 from google.cloud import firestore
 from ..config import get_settings
 from google.cloud.firestore_v1 import Increment
 
+# Statuses a worker holds the processing lock in; a stale lock in any of them can be taken over
+_IN_PROGRESS = frozenset({"processing", "extracting", "llm"})
+
+
+def create_firestore_client() -> firestore.Client:
+    """Build a Firestore client from Settings (shared by all Firestore-backed services)."""
+    settings = get_settings()
+    # Use explicit database if provided in env, else default
+    if settings.FIRESTORE_DATABASE_ID:
+        return firestore.Client(
+            project=settings.GCP_PROJECT or None,
+            database=settings.FIRESTORE_DATABASE_ID,
+        )
+    return firestore.Client()
+
 
 class FirestoreService:
     """Thin wrapper around Firestore client for job operations."""
 
     def __init__(self) -> None:
-        settings = get_settings()
-        # Use explicit database if provided in env, else default
-        if hasattr(settings, "FIRESTORE_DATABASE_ID") and settings.FIRESTORE_DATABASE_ID:
-            self.client = firestore.Client(
-                project=settings.GCP_PROJECT or None,
-                database=settings.FIRESTORE_DATABASE_ID,
-            )
-        else:
-            self.client = firestore.Client()
+        self.client = create_firestore_client()
         self._jobs = self.client.collection("jobs")
 
-    def create_job(self, job_id: str, doc: Dict[str, Any]) -> None:
-        ref = self._jobs.document(job_id)
-        ref.set(doc)
-
-    def set_job_status(self, job_id: str, status: str, stage_key: str) -> None:
-        ref = self._jobs.document(job_id)
-        ref.set(
-            {
-                "status": status,
-                "updatedAt": firestore.SERVER_TIMESTAMP,
-                "stages": {stage_key: firestore.SERVER_TIMESTAMP},
-            },
-            merge=True,
-        )
+    def create_jobs_batch(self, docs: List[Dict[str, Any]]) -> None:
+        """Create several job documents (keyed by their ``jobId``) with WriteBatch commits."""
+        for start in range(0, len(docs), 500):  # Firestore caps a batch at 500 writes
+            batch = self.client.batch()
+            for doc in docs[start : start + 500]:
+                batch.set(self._jobs.document(doc["jobId"]), doc)
+            batch.commit()
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         doc = self._jobs.document(job_id).get()
@@ -52,11 +52,14 @@ class FirestoreService:
         job_id: str,
         worker_id: str,
         stale_minutes: int = 10,
+        status: str = "processing",
     ) -> Optional[Dict[str, Any]]:
         """Attempt to acquire a processing lock transactionally.
 
-        Allows takeover when the existing lock is stale. Returns the updated job
-        on success, or None on contention/invalid state.
+        Allows takeover when the existing lock is stale. The same write moves the
+        job to `status` and stamps its stage and the first heartbeat, so callers
+        need no follow-up status update. Returns the updated job on success, or
+        None on contention/invalid state.
         """
         ref = self._jobs.document(job_id)
 
@@ -66,26 +69,26 @@ class FirestoreService:
             if not snap.exists:
                 return None
             data = snap.to_dict() or {}
-            status = data.get("status")
+            cur_status = data.get("status")
             lock = data.get("processingLock") or {}
             locked_at = lock.get("lockedAt")  # Firestore timestamp or None
+            # The holder's heartbeat keeps refreshing stages.heartbeat while lockedAt stays
+            # at acquisition time; a lock is only stale once neither has moved recently
+            heartbeat = (data.get("stages") or {}).get("heartbeat")
 
-            # Determine staleness: if no lock, it's takeable; if lockedAt older than threshold, takeable
+            # Determine staleness: if no lock, it's takeable; if the last sign of life is older than threshold, takeable
             can_take = False
-            if status in {"uploaded", "queued", "failed"}:
+            if cur_status in {"uploaded", "queued", "failed"}:
                 can_take = True
-            elif status == "processing":
+            elif cur_status in _IN_PROGRESS:
                 if not lock or not locked_at:
                     can_take = True
                 else:
                     try:
-                        # Convert Firestore timestamp to aware datetime
-                        if hasattr(locked_at, "timestamp"):
-                            locked_dt = locked_at
-                        else:
-                            locked_dt = locked_at  # best effort
+                        # Firestore timestamps come back as aware datetimes
+                        last_seen = max(locked_at, heartbeat) if heartbeat else locked_at
                         threshold = datetime.now(timezone.utc) - timedelta(minutes=stale_minutes)
-                        can_take = locked_dt < threshold
+                        can_take = last_seen < threshold
                     except Exception:
                         # If we can't parse, allow conservative takeover after stale_minutes
                         can_take = True
@@ -96,10 +99,14 @@ class FirestoreService:
                 return None
 
             update = {
-                "status": "processing",
+                "status": status,
                 "processingLock": {"lockedBy": worker_id, "lockedAt": firestore.SERVER_TIMESTAMP},
                 "attempt": Increment(1),
-                "stages": {"processing": firestore.SERVER_TIMESTAMP},
+                "stages": {
+                    "processing": firestore.SERVER_TIMESTAMP,
+                    status: firestore.SERVER_TIMESTAMP,
+                    "heartbeat": firestore.SERVER_TIMESTAMP,
+                },
                 "updatedAt": firestore.SERVER_TIMESTAMP,
             }
             tx.set(ref, update, merge=True)
@@ -126,10 +133,12 @@ class FirestoreService:
             merge=True,
         )
 
-    def set_error(self, job_id: str, message: str) -> None:
+    def set_error(self, job_id: str, message: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        """Mark the job failed and release its lock; `extra` fields land in the same write."""
         ref = self._jobs.document(job_id)
         ref.set(
             {
+                **(extra or {}),
                 "status": "failed",
                 "error": message[:2000],
                 "stages": {"failed": firestore.SERVER_TIMESTAMP},
@@ -140,12 +149,41 @@ class FirestoreService:
         )
 
     # Queries
-    def list_jobs_by_session(self, session_id: str) -> List[Dict[str, Any]]:
+    def find_done_job_by_hash(self, session_id: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a finished job of this session whose input PDF had the same SHA-256, if any."""
+        q = (
+            self._jobs
+            .where("sessionId", "==", session_id)
+            .where("contentHash", "==", content_hash)
+            .where("status", "==", "done")
+            .select(["jobId", "resultJson", "confidenceScore"])
+            .limit(1)
+        )
+        for doc in q.stream():
+            return doc.to_dict()
+        return None
+
+    def list_jobs_by_session(
+        self, session_id: str, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """List a session's jobs oldest first.
+
+        Pass `fields` to project server-side, so large values such as `resultJson`
+        are never sent over the wire when the caller does not need them.
+        """
         q = self._jobs.where("sessionId", "==", session_id).order_by("createdAt")
+        if fields:
+            q = q.select(list(fields))
         docs = [doc.to_dict() for doc in q.stream()]
         return docs
 
-    def list_done_jobs_by_session(self, session_id: str) -> List[Dict[str, Any]]:
+    def iter_done_jobs_by_session(
+        self, session_id: str, fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield done jobs as the query streams them, without buffering the result set.
+
+        `fields` projects server-side, as in `list_jobs_by_session`.
+        """
         # Server-side sort by createdAt DESC (requires composite index on
         # sessionId ASC, status ASC, createdAt DESC)
         q = (
@@ -154,22 +192,55 @@ class FirestoreService:
             .where("status", "==", "done")
             .order_by("createdAt", direction=firestore.Query.DESCENDING)
         )
-        docs = [doc.to_dict() for doc in q.stream()]
-        return docs
+        if fields:
+            q = q.select(list(fields))
+        for doc in q.stream():
+            yield doc.to_dict()
 
-    def delete_stale_jobs(self, older_than_hours: int = 24) -> int:
-        """Delete jobs older than the given hours. Returns count deleted."""
+    def delete_stale_jobs(self, older_than_hours: int = 24, batch_size: int = 500) -> int:
+        """Delete jobs older than the given hours. Returns count deleted.
+
+        Deletes are grouped into WriteBatch commits of up to `batch_size`
+        documents (Firestore caps a batch at 500) instead of one RPC per job.
+        A failed batch is skipped and picked up again on the next sweep.
+        """
         cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
-        # Firestore requires an index for range queries on createdAt
-        q = self._jobs.where("createdAt", "<", cutoff)
+        batch_size = max(1, min(500, int(batch_size)))
+        # Firestore requires an index for range queries on createdAt. Only the
+        # document names are needed to delete, so skip fetching any field data.
+        q = self._jobs.where("createdAt", "<", cutoff).select(["__name__"])
         count = 0
+        batch = self.client.batch()
+        pending = 0
         for doc in q.stream():
-            try:
-                doc.reference.delete()
-                count += 1
-            except Exception:
-                pass
+            batch.delete(doc.reference)
+            pending += 1
+            if pending >= batch_size:
+                count += self._commit_deletes(batch, pending)
+                batch = self.client.batch()
+                pending = 0
+        if pending:
+            count += self._commit_deletes(batch, pending)
         return count
 
+    @staticmethod
+    def _commit_deletes(batch: firestore.WriteBatch, pending: int) -> int:
+        try:
+            batch.commit()
+            return pending
+        except Exception:
+            return 0
+
     def delete_job(self, job_id: str) -> None:
         self._jobs.document(job_id).delete()
+
+    def delete_jobs_batch(self, job_ids: List[str]) -> int:
+        """Delete several jobs with WriteBatch commits of up to 500; returns the count deleted."""
+        count = 0
+        for start in range(0, len(job_ids), 500):
+            batch = self.client.batch()
+            chunk = job_ids[start : start + 500]
+            for job_id in chunk:
+                batch.delete(self._jobs.document(job_id))
+            count += self._commit_deletes(batch, len(chunk))
+        return count
@@ -1,7 +1,7 @@
 """Google Cloud Storage helper service."""
 from __future__ import annotations
 
-from typing import Optional
+from typing import BinaryIO, Iterable, Optional
 from google.cloud import storage
 
 
@@ -12,16 +12,37 @@ class GCSService:
         self.bucket_name = bucket_name
         self._client = storage.Client()
         self._bucket = self._client.bucket(bucket_name)
+        self._uri_prefix = f"gs://{bucket_name}/"
 
-    def upload_bytes(self, blob_path: str, data: bytes, content_type: str = "application/pdf") -> str:
+    def parse_uri(self, uri: str) -> Optional[str]:
+        """Return the blob path of a ``gs://`` URI in this bucket, or None for any other URI."""
+        if uri and uri.startswith(self._uri_prefix):
+            return uri[len(self._uri_prefix) :]
+        return None
+
+    def upload_file(
+        self, blob_path: str, fileobj: BinaryIO, size: int, content_type: str = "application/pdf"
+    ) -> str:
+        """Upload from a seekable file object without loading it into a bytes copy first."""
         blob = self._bucket.blob(blob_path)
-        blob.upload_from_string(data, content_type=content_type)
+        blob.upload_from_file(fileobj, rewind=True, size=size, content_type=content_type)
         return f"gs://{self.bucket_name}/{blob_path}"
 
     def delete_blob(self, blob_path: str) -> None:
         blob = self._bucket.blob(blob_path)
         blob.delete(if_generation_match=None)  # ignore preconditions
 
+    def delete_blobs(self, blob_paths: Iterable[str], batch_size: int = 100) -> None:
+        """Delete many blobs using JSON API batch requests (one HTTP call per `batch_size`).
+
+        Missing blobs and per-item failures are ignored, as with best-effort single deletes.
+        """
+        paths = list(blob_paths)
+        for start in range(0, len(paths), batch_size):
+            with self._client.batch(raise_exception=False):
+                for path in paths[start : start + batch_size]:
+                    self._bucket.blob(path).delete()
+
     def blob_exists(self, blob_path: str) -> bool:
         blob = self._bucket.blob(blob_path)
         return blob.exists()
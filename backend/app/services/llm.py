@@ -6,13 +6,16 @@ for transient network and 429/5xx responses.
 """
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import time
+from email.utils import parsedate_to_datetime
 from typing import Any, Dict, Optional
-import os
 
 import httpx
+import orjson
 from tenacity import (
+    RetryCallState,
     retry,
     retry_if_exception,
     stop_after_attempt,
@@ -23,6 +26,63 @@ from ..config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# One pooled client per process so LLM calls reuse keep-alive connections
+# instead of paying a TCP + TLS handshake each time. Created on first use.
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _http_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _CLIENT
+
+
+class _RateLimiter:
+    """Spaces request starts at least `1 / rps` seconds apart (process-wide)."""
+
+    def __init__(self, rps: float) -> None:
+        self._interval = 1.0 / rps if rps > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self._interval
+
+
+# Concurrency cap and request spacing shared by every LLM call in the process, so
+# parallel jobs don't burst into upstream 429s (and tenacity backoff). Built lazily
+# because they read settings.
+_LLM_SEM: Optional[asyncio.Semaphore] = None
+_RATE_LIMITER: Optional[_RateLimiter] = None
+
+
+def _llm_gates() -> tuple[asyncio.Semaphore, _RateLimiter]:
+    global _LLM_SEM, _RATE_LIMITER
+    if _LLM_SEM is None or _RATE_LIMITER is None:
+        settings = get_settings()
+        _LLM_SEM = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _RATE_LIMITER = _RateLimiter(settings.LLM_MAX_RPS)
+    return _LLM_SEM, _RATE_LIMITER
+
+
+async def aclose_http_client() -> None:
+    """Close the shared LLM HTTP client (called on application shutdown)."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
 
 # Retry predicate: network errors, timeouts, and 429/5xx HTTP errors
 def _is_retryable(exc: Exception) -> bool:  # pragma: no cover - simple predicate
@@ -33,6 +93,51 @@ def _is_retryable(exc: Exception) -> bool:  # pragma: no cover - simple predicat
         return status == 429 or 500 <= status < 600
     return False
 
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# OCR text budget per provider, in characters (sanitized text is mostly ASCII,
+# roughly 4 characters per token)
+_GEMINI_MAX_CHARS = 15000
+_OPENROUTER_MAX_CHARS = 12000
+
+
+def _trim_to_budget(text: str, max_chars: int) -> str:
+    """Cut `text` to `max_chars`, at the last line break inside the budget when there is one."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut] if cut > 0 else text[:max_chars]
+
+# Upper bound on an upstream-requested Retry-After, so one job can't stall for minutes
+_RETRY_AFTER_MAX_S = 30.0
+_backoff = wait_random_exponential(multiplier=0.2, max=5)
+
+
+def _retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """Delay requested by a Retry-After header (seconds or HTTP date), if any."""
+    raw = resp.headers.get("Retry-After")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait_for_retry(retry_state: RetryCallState) -> float:
+    """Honor Retry-After on 429/503 responses; otherwise jittered exponential backoff."""
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (429, 503):
+        delay = _retry_after_seconds(exc.response)
+        if delay is not None:
+            return min(delay, _RETRY_AFTER_MAX_S)
+    return _backoff(retry_state)
+
 # Default prompt (v1). Additional versions can be added to PROMPTS below.
 JSON_INSTRUCTIONS = (
     """### ROLE ###
@@ -116,28 +221,35 @@ PROMPTS = {
 class LLMService:
     def __init__(self) -> None:
         self.settings = get_settings()
-        # Read max output tokens from env without modifying global settings
-        try:
-            mot = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "4096"))
-            # Clamp to a reasonable range to avoid provider errors
-            self.max_output_tokens = max(256, min(8192, mot))
-        except Exception:
-            self.max_output_tokens = 4096
+        self.max_output_tokens = self.settings.LLM_MAX_OUTPUT_TOKENS
         # Select prompt by version (defaults to v1)
         self.prompt_version = (self.settings.LLM_PROMPT_VERSION or "v1").strip()
         self.instructions = PROMPTS.get(self.prompt_version, JSON_INSTRUCTIONS)
 
-    def _gemini_url(self) -> str:
+        # Settings are immutable, so endpoint URLs are built once rather than per call
         model = self.settings.GEMINI_MODEL or "gemini-2.5-flash"
-        return f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={self.settings.GEMINI_API_KEY}"
+        self.gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={self.settings.GEMINI_API_KEY}"
+        self.openrouter_url = "https://openrouter.ai/api/v1/chat/completions"
 
-    def _openrouter_url(self) -> str:
-        return "https://openrouter.ai/api/v1/chat/completions"
+        # Request fragments that never change between calls; only the OCR text varies.
+        # They are shared (never mutated) by every payload built below.
+        self._gemini_instructions_part = {"text": self.instructions}
+        self._gemini_generation_config = {
+            "temperature": 0.2,
+            "maxOutputTokens": self.max_output_tokens,
+            "responseMimeType": "application/json",
+        }
+        self._openrouter_model = self.settings.OPENROUTER_MODEL or "meta-llama/llama-3.3-70b-instruct:free"
+        self._openrouter_system_message = {"role": "system", "content": self.instructions}
+        self._openrouter_headers = {
+            "Authorization": f"Bearer {self.settings.OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+        }
 
     @retry(
         reraise=True,
         stop=stop_after_attempt(3),
-        wait=wait_random_exponential(multiplier=0.2, max=5),
+        wait=_wait_for_retry,
         retry=retry_if_exception(_is_retryable),
     )
     async def _post_json(self, url: str, *, headers: Optional[Dict[str, str]] = None, payload: Dict[str, Any], timeout: float = 60.0) -> Dict[str, Any]:
@@ -146,14 +258,21 @@ class LLMService:
         Returns parsed JSON dict.
         """
         t = httpx.Timeout(timeout, connect=5.0)
-        async with httpx.AsyncClient(timeout=t) as client:
-            resp = await client.post(url, headers=headers, json=payload)
-            # Raise for non-2xx and feed status to retry predicate
-            try:
-                resp.raise_for_status()
-            except httpx.HTTPStatusError as e:  # rewrap with context for tenacity
-                raise e
-            return resp.json()
+        # orjson encodes the ~15 KB prompt payload straight to UTF-8 bytes
+        body = orjson.dumps(payload)
+        headers = {**headers, "Content-Type": "application/json"} if headers else _JSON_HEADERS
+        sem, limiter = _llm_gates()
+        # Each attempt (including tenacity retries) takes a slot and respects the spacing
+        async with sem:
+            await limiter.acquire()
+            resp = await _http_client().post(url, headers=headers, content=body, timeout=t)
+        # Raise for non-2xx and feed status to retry predicate
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as e:  # rewrap with context for tenacity
+            raise e
+        # Parse the raw body directly; skips httpx's charset detection and str decode
+        return orjson.loads(resp.content)
 
     async def parse_with_gemini_async(self, text: str) -> Dict[str, Any]:
         if not self.settings.GEMINI_API_KEY:
@@ -163,18 +282,14 @@ class LLMService:
                 {
                     "role": "user",
                     "parts": [
-                        {"text": self.instructions},
-                        {"text": "\n---- OCR TEXT ----\n" + text[:15000]},
+                        self._gemini_instructions_part,
+                        {"text": "\n---- OCR TEXT ----\n" + text[:_GEMINI_MAX_CHARS]},
                     ],
                 }
             ],
-            "generationConfig": {
-                "temperature": 0.2,
-                "maxOutputTokens": self.max_output_tokens,
-                "responseMimeType": "application/json",
-            },
+            "generationConfig": self._gemini_generation_config,
         }
-        data = await self._post_json(self._gemini_url(), payload=payload)
+        data = await self._post_json(self.gemini_url, payload=payload)
         # Gemini may return candidates[0].content.parts[0].text
         try:
             cands = data["candidates"][0]
@@ -184,45 +299,79 @@ class LLMService:
             logger.exception("Gemini unexpected response: %s", data)
             raise RuntimeError(f"Gemini parse error: {e}")
         try:
-            return json.loads(text_out)
+            return orjson.loads(text_out)
         except Exception as e:  # noqa: BLE001
             raise RuntimeError(f"Gemini returned non-JSON: {e}")
 
     async def parse_with_openrouter_async(self, text: str) -> Dict[str, Any]:
         if not self.settings.OPENROUTER_API_KEY:
             raise RuntimeError("Missing OPENROUTER_API_KEY")
-        headers = {
-            "Authorization": f"Bearer {self.settings.OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        }
         payload = {
-            "model": self.settings.OPENROUTER_MODEL or "meta-llama/llama-3.3-70b-instruct:free",
+            "model": self._openrouter_model,
             "messages": [
-                {"role": "system", "content": self.instructions},
-                {"role": "user", "content": text[:12000]},
+                self._openrouter_system_message,
+                {"role": "user", "content": text[:_OPENROUTER_MAX_CHARS]},
             ],
             "temperature": 0.2,
             "max_tokens": self.max_output_tokens,
         }
-        data = await self._post_json(self._openrouter_url(), headers=headers, payload=payload)
+        data = await self._post_json(self.openrouter_url, headers=self._openrouter_headers, payload=payload)
         try:
             content = data["choices"][0]["message"]["content"]
         except Exception as e:  # noqa: BLE001
             logger.exception("OpenRouter unexpected response: %s", data)
             raise RuntimeError(f"OpenRouter parse error: {e}")
         try:
-            return json.loads(content)
+            return orjson.loads(content)
         except Exception as e:  # noqa: BLE001
             raise RuntimeError(f"OpenRouter returned non-JSON: {e}")
 
     async def extract_invoice_async(self, text: str) -> Dict[str, Any]:
-        """Try Gemini, fallback to OpenRouter, returning parsed invoice JSON."""
+        """Try Gemini, fallback to OpenRouter, returning parsed invoice JSON.
+
+        If Gemini is still running after `LLM_HEDGE_DELAY_S`, OpenRouter is started
+        alongside it and the first successful answer wins; the other call is cancelled.
+        """
+        # Trim once, on a line boundary, so no provider sees a half line; the
+        # fallback budget is cut from the already-trimmed text
+        text = _trim_to_budget(text, _GEMINI_MAX_CHARS)
+        fallback_text = _trim_to_budget(text, _OPENROUTER_MAX_CHARS)
+        primary = asyncio.create_task(self.parse_with_gemini_async(text))
+        hedge_delay = self.settings.LLM_HEDGE_DELAY_S
         try:
-            return await self.parse_with_gemini_async(text)
-        except Exception as e:
-            logger.warning("Gemini failed: %s", e)
+            if hedge_delay > 0 and self.settings.OPENROUTER_API_KEY:
+                done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+                if not done:
+                    logger.info("Gemini slower than %.1fs; hedging with OpenRouter", hedge_delay)
+                    secondary = asyncio.create_task(self.parse_with_openrouter_async(fallback_text))
+                    return await self._first_success(primary, secondary)
+            try:
+                return await primary
+            except Exception as e:
+                logger.warning("Gemini failed: %s", e)
+        finally:
+            # No-op once finished; stops the Gemini call if we are cancelled mid-wait
+            primary.cancel()
         try:
-            return await self.parse_with_openrouter_async(text)
+            return await self.parse_with_openrouter_async(fallback_text)
         except Exception as e:
             logger.error("OpenRouter failed: %s", e)
             raise
+
+    @staticmethod
+    async def _first_success(primary: asyncio.Task, secondary: asyncio.Task) -> Dict[str, Any]:
+        """Result of whichever task succeeds first; raises the fallback's error if both fail."""
+        pending = {primary, secondary}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    if task is primary:
+                        logger.warning("Gemini failed: %s", task.exception())
+            logger.error("OpenRouter failed: %s", secondary.exception())
+            raise secondary.exception()  # type: ignore[misc]
+        finally:
+            for task in pending:
+                task.cancel()
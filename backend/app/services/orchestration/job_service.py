@@ -3,15 +3,18 @@ from __future__ import annotations
 import asyncio
 import io
 import csv
+import hashlib
+import os
 import uuid
-from typing import List
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, List
 import logging
 
 from fastapi import UploadFile, HTTPException
 from google.cloud import firestore
 
 from ...config import get_settings
-from ...models import JobItem, Invoice
+from ...models import CSV_COLUMNS, JobItem, Invoice
 from ...services.firestore import FirestoreService
 from ...services.gcs import GCSService
 from ...services.rate_limit import RateLimiterService
@@ -28,6 +31,33 @@ from ...exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Rows buffered before a CSV chunk is handed to the streaming response
+_CSV_CHUNK_ROWS = 500
+# The only job fields the CSV export reads
+_CSV_JOB_FIELDS = ("filename", "confidenceScore", "resultJson")
+# Page counts of recently seen PDFs keyed by SHA-256 (LRU). Only touched on the
+# event loop, so it needs no lock.
+_PAGE_COUNT_CACHE_SIZE = 1024
+_PAGE_COUNTS: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _upload_size(f: UploadFile) -> int:
+    """Size of an uploaded file, from the multipart parser or by seeking its spool file."""
+    if f.size is not None:
+        return f.size
+    f.file.seek(0, os.SEEK_END)
+    size = f.file.tell()
+    f.file.seek(0)
+    return size
+
+
+def _sha256_file(fileobj: BinaryIO) -> str:
+    """Hex SHA-256 of a seekable file, hashed by OpenSSL in buffered chunks."""
+    fileobj.seek(0)
+    digest = hashlib.file_digest(fileobj, "sha256").hexdigest()
+    fileobj.seek(0)
+    return digest
+
 
 class JobOrchestrationService:
     """Orchestrates job creation, retry, CSV export, and session deletion.
@@ -65,123 +95,240 @@ class JobOrchestrationService:
 
         # App-level rate limiting
         # Allow RateLimiterService to raise HTTPException with headers; do not intercept here.
-        self._limiter.enforce_upload(session_id=session_id, files_count=len(files), client_ip=client_ip or "")
-
-        job_items: List[JobItem] = []
+        # Its Firestore transactions are blocking, so they run in a worker thread.
+        await asyncio.to_thread(
+            self._limiter.enforce_upload, session_id=session_id, files_count=len(files), client_ip=client_ip or ""
+        )
 
-        for f in files:
-            if f.content_type not in self.settings.ACCEPTED_MIME:
-                raise FileValidationError(f"Unsupported MIME type: {f.content_type}")
+        # Validate every file before any side effect so a bad 10th file
+        # doesn't leave the first nine uploaded and orphaned
+        sizes = [self._check_file(f) for f in files]
+        sem = asyncio.Semaphore(self.settings.UPLOAD_CONCURRENCY)
+        docs = await asyncio.gather(
+            *(self._prepare_file(sem, session_id, f, size) for f, size in zip(files, sizes))
+        )
 
-            file_bytes = await f.read()
-            if not file_bytes:
-                raise FileValidationError(f"File {f.filename} is empty")
+        # Duplicates of already-extracted PDFs are created as done and skip upload and queue
+        to_upload = [(d, f) for d, f in zip(docs, files) if d["status"] == "queued"]
+        uploaded = await self._upload_all(sem, session_id, to_upload)
+        job_ids = [d["jobId"] for d, _ in to_upload]
 
-            size_bytes = len(file_bytes)
-            if size_bytes > self.settings.MAX_SIZE_MB * 1024 * 1024:
-                raise PayloadTooLargeError(f"File {f.filename} exceeds size limit")
+        # One batched commit creates every job document, already `queued`, before any task can run
+        try:
+            await asyncio.to_thread(self._store.create_jobs_batch, docs)
+        except Exception as exc:
+            logger.error("[%s] Firestore job creation failed: %s", session_id, exc)
+            # No job document points at these blobs, so neither session deletion nor
+            # retention would ever find them; remove them now (best-effort)
+            await self._delete_uploaded(uploaded)
+            raise ExternalServiceError("Storage error while creating jobs")
+
+        if job_ids:
+            # Enqueue processing tasks concurrently (may be emulated locally)
+            await asyncio.gather(*(self._enqueue(job_id, session_id) for job_id in job_ids))
+
+        # Local emulation: if TASKS_EMULATE is true, process asynchronously without Cloud Tasks
+        if self.settings.TASKS_EMULATE:
+            # Use pipeline service directly to avoid router imports
+            from ...deps import get_task_pipeline
+
+            pipeline = get_task_pipeline()
+            for job_id in job_ids:
+                asyncio.create_task(pipeline.process_invoice_job(job_id, session_id))
+
+        return [
+            JobItem(
+                jobId=d["jobId"],
+                filename=d["filename"],
+                status=d["status"],
+                sizeBytes=d["sizeBytes"],
+                pageCount=d["pageCount"],
+            )
+            for d in docs
+        ]
 
-            try:
-                page_count = count_pdf_pages(file_bytes)
-            except HTTPException as e:
-                # Normalize to domain exception for consistent router mapping
-                raise FileValidationError(e.detail if hasattr(e, "detail") else "Invalid PDF")
+    def _check_file(self, f: UploadFile) -> int:
+        """Cheap MIME and size checks for one uploaded PDF; returns its size in bytes."""
+        if f.content_type not in self.settings.ACCEPTED_MIME:
+            raise FileValidationError(f"Unsupported MIME type: {f.content_type}")
+
+        # Starlette has already spooled the part to a temp file; work from that
+        # instead of reading the whole PDF into memory again
+        size_bytes = _upload_size(f)
+        if not size_bytes:
+            raise FileValidationError(f"File {f.filename} is empty")
+        if size_bytes > self.settings.MAX_SIZE_BYTES:
+            raise PayloadTooLargeError(f"File {f.filename} exceeds size limit")
+        return size_bytes
+
+    async def _prepare_file(self, sem: asyncio.Semaphore, session_id: str, f: UploadFile, size_bytes: int) -> dict:
+        """Count pages, hash and look up duplicates for one PDF; returns its job document.
+
+        Has no side effects: the document is `done` when an identical PDF was already
+        extracted in this session, otherwise `queued` with `gcsUri` still to be set.
+        """
+        async with sem:
+            content_hash = await asyncio.to_thread(_sha256_file, f.file)
+            # Identical bytes were parsed before (re-upload of the same PDF): reuse the count
+            page_count = _PAGE_COUNTS.get(content_hash)
+            if page_count is None:
+                try:
+                    # pypdf parsing is CPU-bound; keep it off the event loop
+                    page_count = await asyncio.to_thread(count_pdf_pages, f.file)
+                except HTTPException as e:
+                    # Normalize to domain exception for consistent router mapping
+                    raise FileValidationError(e.detail if hasattr(e, "detail") else "Invalid PDF")
+                _PAGE_COUNTS[content_hash] = page_count
+                if len(_PAGE_COUNTS) > _PAGE_COUNT_CACHE_SIZE:
+                    _PAGE_COUNTS.popitem(last=False)
+            else:
+                _PAGE_COUNTS.move_to_end(content_hash)
             if page_count > self.settings.MAX_PAGES:
                 raise FileValidationError(f"File {f.filename} exceeds page limit")
 
-            job_id = str(uuid.uuid4())
-            blob_path = f"uploads/{session_id}/{job_id}.pdf"
-            try:
-                gcs_uri = self._gcs.upload_bytes(blob_path, file_bytes, content_type="application/pdf")
-            except Exception as exc:
-                logger.error("[%s] GCS upload failed: %s", session_id, exc)
-                raise ExternalServiceError("Storage error while uploading file")
-
-            # Create Firestore job document
-            self._store.create_job(
-                job_id,
+        job_id = str(uuid.uuid4())
+        doc = {
+            "jobId": job_id,
+            "sessionId": session_id,
+            "filename": f.filename,
+            "sizeBytes": size_bytes,
+            "pageCount": page_count,
+            "contentHash": content_hash,
+            "createdAt": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+            "updatedAt": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+        }
+
+        # Same PDF already extracted in this session: copy its result instead of
+        # uploading and running OCR + LLM again. The new job keeps its own ID.
+        try:
+            prior = await asyncio.to_thread(self._store.find_done_job_by_hash, session_id, content_hash)
+        except Exception as exc:  # lookup is an optimization only
+            logger.warning("[%s] duplicate lookup failed: %s", session_id, exc)
+            prior = None
+        if prior and prior.get("resultJson"):
+            logger.info("[%s] %s matches done job %s; reusing result", session_id, job_id, prior.get("jobId"))
+            doc.update(
                 {
-                    "jobId": job_id,
-                    "sessionId": session_id,
-                    "filename": f.filename,
-                    "sizeBytes": size_bytes,
-                    "pageCount": page_count,
-                    "gcsUri": gcs_uri,
-                    "status": "uploaded",
-                    "stages": {"uploaded": firestore.SERVER_TIMESTAMP},  # type: ignore[name-defined]
-                    "createdAt": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
-                    "updatedAt": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
-                },
+                    "gcsUri": "",
+                    "status": "done",
+                    "resultJson": prior["resultJson"],
+                    "confidenceScore": prior.get("confidenceScore"),
+                    "reusedFrom": prior.get("jobId"),
+                    "stages": {
+                        "uploaded": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+                        "done": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+                    },
+                }
             )
+            return doc
+
+        doc.update(
+            {
+                # Written once as `queued`: the document is committed only after the upload
+                # and right before its task is enqueued
+                "status": "queued",
+                "stages": {
+                    "uploaded": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+                    "queued": firestore.SERVER_TIMESTAMP,  # type: ignore[name-defined]
+                },
+            }
+        )
+        return doc
 
-            # Enqueue processing task (may be emulated locally)
-            try:
-                self._tasks.enqueue_job(job_id, session_id)
-            except Exception as exc:
-                logger.error("[%s] Cloud Tasks enqueue failed for job %s: %s", session_id, job_id, exc)
-                raise ExternalServiceError("Task queue error while enqueuing job")
-            self._store.set_job_status(job_id, "queued", "queued")
-
-            # Local emulation: if TASKS_EMULATE is true, process asynchronously without Cloud Tasks
-            if self.settings.TASKS_EMULATE:
-                # Use pipeline service directly to avoid router imports
-                from .task_pipeline import TaskPipelineService
-
-                asyncio.create_task(TaskPipelineService().process_invoice_job(job_id, session_id))
-
-            job_items.append(
-                JobItem(
-                    jobId=job_id,
-                    filename=f.filename,
-                    status="queued",
-                    sizeBytes=size_bytes,
-                    pageCount=page_count,
+    async def _upload_all(self, sem: asyncio.Semaphore, session_id: str, pending: List[tuple]) -> List[str]:
+        """Store validated PDFs in GCS concurrently, set each document's `gcsUri` and return the blob paths.
+
+        If any upload fails, blobs already written by this request are removed
+        (best-effort) before the error is raised, so no job documents point nowhere.
+        """
+
+        async def _one(doc: dict, f: UploadFile) -> str:
+            blob_path = f"uploads/{session_id}/{doc['jobId']}.pdf"
+            # Blocking client call runs in a worker thread so other files proceed meanwhile
+            async with sem:
+                doc["gcsUri"] = await asyncio.to_thread(
+                    self._gcs.upload_file, blob_path, f.file, doc["sizeBytes"], content_type="application/pdf"
                 )
-            )
+            return blob_path
+
+        results = await asyncio.gather(*(_one(d, f) for d, f in pending), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if not errors:
+            return results
+        logger.error("[%s] GCS upload failed: %s", session_id, errors[0])
+        await self._delete_uploaded([r for r in results if isinstance(r, str)])
+        raise ExternalServiceError("Storage error while uploading file")
+
+    async def _delete_uploaded(self, blob_paths: List[str]) -> None:
+        """Best-effort removal of blobs written by a request that is about to fail."""
+        if not blob_paths:
+            return
+        try:
+            await asyncio.to_thread(self._gcs.delete_blobs, blob_paths)
+        except Exception:
+            pass
 
-        return job_items
+    async def _enqueue(self, job_id: str, session_id: str) -> None:
+        try:
+            await self._tasks.enqueue_job_async(job_id, session_id)
+        except Exception as exc:
+            logger.error("[%s] Cloud Tasks enqueue failed for job %s: %s", session_id, job_id, exc)
+            # The job was created as `queued`; mark it failed so it can be retried instead of waiting forever
+            try:
+                await asyncio.to_thread(self._store.set_error, job_id, "Task queue error while enqueuing job")
+            except Exception:
+                pass
+            raise ExternalServiceError("Task queue error while enqueuing job")
 
     async def retry_job(self, job_id: str, session_id: str) -> None:
         job = self._store.get_job(job_id)
         if not job or job.get("sessionId") != session_id:
             raise NotFoundError("Job not found")
 
-        gcs_uri: str = job.get("gcsUri", "")
-        prefix = f"gs://{self.settings.GCS_BUCKET}/"
-        if gcs_uri.startswith(prefix):
-            blob_path = gcs_uri[len(prefix) :]
-            exists = self._gcs.blob_exists(blob_path)
-        else:
-            exists = False
+        blob_path = self._gcs.parse_uri(job.get("gcsUri", ""))
+        exists = self._gcs.blob_exists(blob_path) if blob_path else False
 
         if not exists:
             raise ConflictError("Original PDF not available; re-upload required")
 
         self._tasks.enqueue_job(job_id, session_id)
-        self._store.set_job_status(job_id, "queued", "queued")
-        # Increment manual retry counter (best-effort)
-        try:
-            from google.cloud.firestore_v1 import Increment
-
-            self._store.update_job(job_id, {"manualRetries": Increment(1)})
-        except Exception:
-            pass
+        # Status, stage timestamp and manual retry counter in a single write
+        from google.cloud.firestore_v1 import Increment
+
+        self._store.update_job(
+            job_id,
+            {
+                "status": "queued",
+                "stages": {"queued": firestore.SERVER_TIMESTAMP},  # type: ignore[name-defined]
+                "manualRetries": Increment(1),
+            },
+        )
 
         if self.settings.TASKS_EMULATE:
-            from .task_pipeline import TaskPipelineService
+            from ...deps import get_task_pipeline
+
+            asyncio.create_task(get_task_pipeline().process_invoice_job(job_id, session_id))
 
-            asyncio.create_task(TaskPipelineService().process_invoice_job(job_id, session_id))
+    def get_session_jobs_as_csv(self, session_id: str) -> Iterator[bytes]:
+        """Yield completed invoices of a session as UTF-8 CSV chunks.
 
-    async def get_session_jobs_as_csv(self, session_id: str) -> bytes:
-        docs = self._store.list_done_jobs_by_session(session_id)
-        rows: List[dict] = []
-        for d in docs:
+        This is a plain generator on purpose: StreamingResponse iterates it in a
+        worker thread, so the blocking Firestore stream stays off the event loop.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS)
+        pending = 0
+        # Documents are consumed as Firestore streams them, one invoice in memory at a time
+        for d in self._store.iter_done_jobs_by_session(session_id, fields=_CSV_JOB_FIELDS):
             res = d.get("resultJson")
             if not res:
                 continue
             try:
-                inv = Invoice.model_validate_jsonish(res)
-                rows.extend(
+                # resultJson was validated by the pipeline before it was stored
+                inv = Invoice.from_trusted(res)
+                # Materialize one invoice at a time so a bad document is skipped whole
+                rows = list(
                     inv.to_csv_rows(
                         filename=d.get("filename", ""),
                         confidence=d.get("confidenceScore"),
@@ -190,47 +337,24 @@ class JobOrchestrationService:
             except Exception:
                 # skip invalid
                 continue
-
-        # Serialize to CSV bytes
-        output = io.StringIO()
-        fieldnames = [
-            "invoiceNumber",
-            "invoiceDate",
-            "vendorName",
-            "currency",
-            "subtotal",
-            "tax",
-            "total",
-            "dueDate",
-            "lineItemIndex",
-            "description",
-            "quantity",
-            "unitPrice",
-            "lineTotal",
-            "confidenceScore",
-            "filename",
-        ]
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
-        return output.getvalue().encode("utf-8")
+            writer.writerows(rows)
+            pending += len(rows)
+            if pending >= _CSV_CHUNK_ROWS:
+                yield output.getvalue().encode("utf-8")
+                output.seek(0)
+                output.truncate()
+                pending = 0
+        yield output.getvalue().encode("utf-8")
 
     async def delete_session_data(self, session_id: str) -> int:
-        docs = self._store.list_jobs_by_session(session_id)
-        deleted = 0
-        for d in docs:
-            gcs_uri: str = d.get("gcsUri", "")
-            try:
-                prefix = f"gs://{self.settings.GCS_BUCKET}/"
-                if gcs_uri.startswith(prefix):
-                    blob_path = gcs_uri[len(prefix) :]
-                    self._gcs.delete_blob(blob_path)
-            except Exception:
-                pass
-            try:
-                self._store.delete_job(d.get("jobId"))
-                deleted += 1
-            except Exception:
-                pass
-        return deleted
+        docs = await asyncio.to_thread(self._store.list_jobs_by_session, session_id, fields=("jobId", "gcsUri"))
+        # Input PDFs go in batched storage requests rather than one DELETE per job
+        blob_paths = [p for p in (self._gcs.parse_uri(d.get("gcsUri", "")) for d in docs) if p]
+        job_ids = [d["jobId"] for d in docs if d.get("jobId")]
+        # Storage and Firestore cleanups are independent; run both batched deletes at once
+        _, deleted = await asyncio.gather(
+            asyncio.to_thread(self._gcs.delete_blobs, blob_paths),
+            asyncio.to_thread(self._store.delete_jobs_batch, job_ids),
+            return_exceptions=True,
+        )
+        return deleted if isinstance(deleted, int) else 0
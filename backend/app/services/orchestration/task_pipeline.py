@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any, Dict
 
@@ -20,6 +21,17 @@ from ...pipeline.evaluation import compute_confidence
 
 logger = logging.getLogger(__name__)
 
+# Seconds between liveness writes while a job holds the processing lock
+_HEARTBEAT_INTERVAL_S = 15
+
+
+def _token_proxy(text: str) -> int:
+    """Approximate word count from separator counts, without building a list.
+
+    Exact for sanitized text (single spaces within lines, one newline between them).
+    """
+    return text.count(" ") + text.count("\n") + 1 if text else 0
+
 
 class TaskPipelineService:
     """Owns the execution of a single job's processing pipeline."""
@@ -32,23 +44,48 @@ class TaskPipelineService:
         self.llm = LLMService()
         self.worker_id = "tasks-worker"  # TODO: derive from hostname or env if needed
 
+    async def _heartbeat(self, job_id: str, stop: asyncio.Event) -> None:
+        """Touch `stages.heartbeat` every interval until `stop` is set.
+
+        The first heartbeat is written by the lock acquisition itself.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=_HEARTBEAT_INTERVAL_S)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.to_thread(
+                    self.store.update_job, job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}}
+                )
+            except Exception:
+                pass
+
     async def process_invoice_job(self, job_id: str, session_id: str) -> Dict[str, Any]:
         # Acquire processing lock; if not obtained, return 200 to avoid retry storms
-        locked = self.store.acquire_processing_lock(
-            job_id, worker_id=self.worker_id, stale_minutes=self.settings.LOCK_STALE_MINUTES
+        # Firestore/GCS clients are synchronous; every call below goes through a worker thread
+        # so concurrent jobs on this process keep interleaving on the event loop.
+        locked = await asyncio.to_thread(
+            self.store.acquire_processing_lock,
+            job_id,
+            worker_id=self.worker_id,
+            stale_minutes=self.settings.LOCK_STALE_MINUTES,
+            # Lock, OCR stage and first heartbeat land in one transactional write
+            status="extracting",
         )
         if not locked:
             logger.info("[%s][%s] lock not acquired", job_id, self.worker_id)
             return {"ok": True, "jobId": job_id, "note": "lock not acquired; likely processed by another worker"}
 
+        # Liveness is reported by one background writer instead of inline writes per stage
+        hb_stop = asyncio.Event()
+        hb_task = asyncio.create_task(self._heartbeat(job_id, hb_stop))
+        # set_result/set_error clear processingLock in their own write; release only
+        # when the job ends without either (e.g. a failure before the terminal write)
+        lock_released = False
         try:
-            # Heartbeat: lock acquired
-            try:
-                self.store.update_job(job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}})
-            except Exception:
-                pass
-
-            job = self.store.get_job(job_id)
+            job = await asyncio.to_thread(self.store.get_job, job_id)
             if not job:
                 raise HTTPException(status_code=404, detail="Job not found")
             if job.get("sessionId") != session_id:
@@ -56,36 +93,26 @@ class TaskPipelineService:
 
             gcs_uri: str = job.get("gcsUri", "")
             if not gcs_uri.startswith("gs://"):
-                self.store.set_error(job_id, "Missing GCS URI for job")
+                await asyncio.to_thread(self.store.set_error, job_id, "Missing GCS URI for job")
+                lock_released = True
                 return {"ok": False, "jobId": job_id, "error": "missing gcsUri"}
 
-            # OCR stage
-            self.store.set_job_status(job_id, "extracting", "extracting")
-            try:
-                self.store.update_job(job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}})
-            except Exception:
-                pass
+            # OCR stage (status already set to `extracting` with the lock)
             temp_prefix = f"gs://{self.settings.GCS_BUCKET}/vision/{job_id}/"
             page_count = job.get("pageCount", self.settings.MAX_PAGES)
-            ocr = self.vision.ocr_pdf_from_gcs(
+            # Vision calls block (async OCR waits up to 300s); run them off the event loop
+            ocr = await asyncio.to_thread(
+                self.vision.ocr_pdf_from_gcs,
                 gcs_uri,
                 temp_prefix=temp_prefix,
                 batch_size=min(page_count, self.settings.MAX_PAGES),
                 page_count=page_count,
             )
-            try:
-                self.store.update_job(job_id, {"ocrMethod": ocr.method})
-            except Exception:
-                pass
             logger.info("[%s][%s] OCR method: %s", job_id, self.worker_id, getattr(ocr, "method", "unknown"))
-            try:
-                self.store.update_job(job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}})
-            except Exception:
-                pass
 
             # Preprocess via sanitizer
             raw_text = ocr.text or ""
-            raw_token_proxy = len(raw_text.split())
+            raw_token_proxy = _token_proxy(raw_text)
             preproc_stats = {"reduction": 0.0}
             text_for_llm = sanitize_for_llm(
                 raw_text,
@@ -95,7 +122,7 @@ class TaskPipelineService:
             )
             base = max(1, len(raw_text))
             preproc_stats["reduction"] = round(max(0.0, 1.0 - (len(text_for_llm) / float(base))), 3)
-            sanitized_token_proxy = len(text_for_llm.split())
+            sanitized_token_proxy = _token_proxy(text_for_llm)
             logger.info(
                 "[%s][%s] Sanitization metrics - raw_tokens=%s, sanitized_tokens=%s",
                 job_id,
@@ -104,17 +131,33 @@ class TaskPipelineService:
                 sanitized_token_proxy,
             )
 
-            # LLM extraction
-            self.store.set_job_status(job_id, "llm", "llm")
-            try:
-                self.store.update_job(job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}})
-            except Exception:
-                pass
+            # Nothing an LLM could extract an invoice from; fail fast instead of paying for the call
+            if len(text_for_llm) < self.settings.MIN_OCR_CHARS:
+                logger.info("[%s][%s] OCR text too short (%s chars)", job_id, self.worker_id, len(text_for_llm))
+                # Record which OCR path ran and how much the sanitizer cut: this is the
+                # failure where those fields matter most
+                await asyncio.to_thread(
+                    self.store.set_error,
+                    job_id,
+                    "OCR produced insufficient text",
+                    {"ocrMethod": ocr.method, "preprocess": preproc_stats},
+                )
+                lock_released = True
+                return {"ok": False, "jobId": job_id, "error": "insufficient ocr text"}
+
+            # LLM extraction; the stage change carries the OCR method and lightweight
+            # preprocessing stats (no payload storage) in the same write
+            await asyncio.to_thread(
+                self.store.update_job,
+                job_id,
+                {
+                    "status": "llm",
+                    "stages": {"llm": firestore.SERVER_TIMESTAMP},
+                    "ocrMethod": ocr.method,
+                    "preprocess": preproc_stats,
+                },
+            )
             parsed = await self.llm.extract_invoice_async(text_for_llm)
-            try:
-                self.store.update_job(job_id, {"stages": {"heartbeat": firestore.SERVER_TIMESTAMP}})
-            except Exception:
-                pass
 
             # Validate & coerce
             invoice = Invoice.model_validate_jsonish(parsed)
@@ -125,23 +168,19 @@ class TaskPipelineService:
             )
 
             # Persist result
-            self.store.set_result(
+            await asyncio.to_thread(
+                self.store.set_result,
                 job_id,
                 result_json=invoice.model_dump(mode="json"),
                 confidence=confidence,
             )
-            # Save lightweight preprocessing stats only (no payload storage)
-            try:
-                self.store.update_job(job_id, {"preprocess": preproc_stats})
-            except Exception:
-                pass
+            lock_released = True
 
             # Cleanup input PDF (best-effort)
             try:
-                prefix = f"gs://{self.settings.GCS_BUCKET}/"
-                if gcs_uri.startswith(prefix):
-                    blob_path = gcs_uri[len(prefix) :]
-                    self.gcs.delete_blob(blob_path)
+                blob_path = self.gcs.parse_uri(gcs_uri)
+                if blob_path:
+                    await asyncio.to_thread(self.gcs.delete_blob, blob_path)
             except Exception:
                 pass
 
@@ -162,31 +201,41 @@ class TaskPipelineService:
             except Exception:
                 preview = None
             logger.error("[%s] validation error: %s | details=%s | preview=%s", job_id, exc, err_details, preview)
-            self.store.set_error(job_id, "Validation error: invoice schema mismatch (see logs)")
+            await asyncio.to_thread(
+                self.store.set_error, job_id, "Validation error: invoice schema mismatch (see logs)"
+            )
+            lock_released = True
             return {"ok": False, "jobId": job_id, "error": "validation error"}
 
         except (httpx.RequestError, httpx.HTTPStatusError) as exc:
             logger.error("[%s] network/LLM error: %s", job_id, exc)
-            self.store.set_error(job_id, "Transient API error, will retry")
+            await asyncio.to_thread(self.store.set_error, job_id, "Transient API error, will retry")
+            lock_released = True
             return {"ok": False, "jobId": job_id, "error": "transient api error"}
 
         except (Exception,) as exc:
             # Preserve specific HTTP and GCP exceptions semantics similar to prior code
             if isinstance(exc, (HTTPException,)):
                 logger.error("[%s] http error: %s", job_id, getattr(exc, "detail", str(exc)))
-                self.store.set_error(job_id, getattr(exc, "detail", "HTTP error"))
+                await asyncio.to_thread(self.store.set_error, job_id, getattr(exc, "detail", "HTTP error"))
+                lock_released = True
                 raise
             if isinstance(exc, GoogleAPIError):
                 logger.error("[%s] GCP service error: %s", job_id, exc)
-                self.store.set_error(job_id, "Storage or Firestore error")
+                await asyncio.to_thread(self.store.set_error, job_id, "Storage or Firestore error")
+                lock_released = True
                 return {"ok": False, "jobId": job_id, "error": "gcp service error"}
             logger.exception("[%s] unexpected error", job_id)
-            self.store.set_error(job_id, "Unexpected internal error")
+            await asyncio.to_thread(self.store.set_error, job_id, "Unexpected internal error")
+            lock_released = True
             return {"ok": False, "jobId": job_id, "error": "unexpected error"}
 
         finally:
+            hb_stop.set()
+            await hb_task
             # Always release the lock to avoid stuck jobs
-            try:
-                self.store.release_processing_lock(job_id)
-            except Exception:
-                pass
+            if not lock_released:
+                try:
+                    await asyncio.to_thread(self.store.release_processing_lock, job_id)
+                except Exception:
+                    pass
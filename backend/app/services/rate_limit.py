@@ -22,6 +22,7 @@ from fastapi import HTTPException
 from google.cloud import firestore
 
 from ..config import get_settings
+from .firestore import create_firestore_client
 
 
 @dataclass
@@ -43,14 +44,7 @@ class RLHeaders:
 class RateLimiterService:
     def __init__(self) -> None:
         self.settings = get_settings()
-        # Respect explicit database when provided
-        if getattr(self.settings, "FIRESTORE_DATABASE_ID", ""):
-            self.client = firestore.Client(
-                project=self.settings.GCP_PROJECT or None,
-                database=self.settings.FIRESTORE_DATABASE_ID,
-            )
-        else:
-            self.client = firestore.Client()
+        self.client = create_firestore_client()
         self._rl = self.client.collection("rl")
         self._daily = self.client.collection("rl_daily")
 
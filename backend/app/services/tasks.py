@@ -27,21 +27,19 @@ class CloudTasksService:
     def __init__(self, cfg: TasksConfig) -> None:
         self.cfg = cfg
         self._client = tasks_v2.CloudTasksClient()
+        self._async_client: Optional[tasks_v2.CloudTasksAsyncClient] = None
 
-    def enqueue_job(self, job_id: str, session_id: str) -> Optional[str]:
-        """Create a task to call the worker endpoint with OIDC.
-
-        Returns the task name on success, or None if emulated/no-op.
-        Raises on irrecoverable API errors.
-        """
+    def _should_skip(self, job_id: str) -> bool:
         if self.cfg.emulate or not all([
             self.cfg.project, self.cfg.region, self.cfg.queue,
             self.cfg.target_url, self.cfg.service_account_email,
         ]):
             logger.info("Tasks emulation/no-op: skipping enqueue for job %s", job_id)
-            return None
+            return True
+        return False
 
-        parent = self._client.queue_path(self.cfg.project, self.cfg.region, self.cfg.queue)
+    def _task_request(self, job_id: str, session_id: str) -> dict:
+        parent = tasks_v2.CloudTasksClient.queue_path(self.cfg.project, self.cfg.region, self.cfg.queue)
         payload = {"jobId": job_id, "sessionId": session_id}
         task = {
             "http_request": {
@@ -55,6 +53,31 @@ class CloudTasksService:
                 },
             }
         }
-        response = self._client.create_task(request={"parent": parent, "task": task})
+        return {"parent": parent, "task": task}
+
+    def enqueue_job(self, job_id: str, session_id: str) -> Optional[str]:
+        """Create a task to call the worker endpoint with OIDC.
+
+        Returns the task name on success, or None if emulated/no-op.
+        Raises on irrecoverable API errors.
+        """
+        if self._should_skip(job_id):
+            return None
+        response = self._client.create_task(request=self._task_request(job_id, session_id))
+        logger.info("Created task %s for job %s", response.name, job_id)
+        return response.name
+
+    async def enqueue_job_async(self, job_id: str, session_id: str) -> Optional[str]:
+        """Async variant of enqueue_job; lets callers fan out several enqueues at once.
+
+        Cloud Tasks has no bulk create, so concurrent calls over the async client's
+        shared channel are the cheapest way to enqueue a batch.
+        """
+        if self._should_skip(job_id):
+            return None
+        if self._async_client is None:
+            # Created lazily so the gRPC aio channel binds to the running event loop
+            self._async_client = tasks_v2.CloudTasksAsyncClient()
+        response = await self._async_client.create_task(request=self._task_request(job_id, session_id))
         logger.info("Created task %s for job %s", response.name, job_id)
         return response.name
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
 import io
+from typing import BinaryIO
+
 from fastapi import HTTPException
 from pypdf import PdfReader
 
 
-def count_pdf_pages(data: bytes) -> int:
-    """Count pages of a PDF from raw bytes.
+def count_pdf_pages(data: bytes | BinaryIO) -> int:
+    """Count pages of a PDF from raw bytes or a seekable binary stream.
 
+    Streams are read from the start; callers must rewind them before reuse.
     Raises HTTP 400 (Bad Request) on invalid or unreadable PDFs to match previous behavior.
     """
     try:
-        reader = PdfReader(io.BytesIO(data))
+        if isinstance(data, (bytes, bytearray)):
+            stream: BinaryIO = io.BytesIO(data)
+        else:
+            stream = data
+            stream.seek(0)
+        reader = PdfReader(stream)
+        # Walk the actual page tree: the root's /Count is uploader-controlled and
+        # must not decide the MAX_PAGES check or which pages get OCR'd
         return len(reader.pages)
     except Exception as exc:  # noqa: BLE001 broad, returns user error
         raise HTTPException(status_code=400, detail="Invalid or unreadable PDF") from exc
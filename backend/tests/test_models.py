@@ -0,0 +1,81 @@
+import copy
+from datetime import date
+
+import pytest
+
+from app.models import Invoice
+
+
+def _clean() -> dict:
+    """LLM output that is already canonical, as the fast path expects it."""
+    return {
+        "invoiceNumber": "INV-1",
+        "invoiceDate": "2024-01-05",
+        "vendorName": "ACME BV",
+        "currency": "eur",
+        "subtotal": 100,
+        "tax": 21.0,
+        "total": 121.0,
+        "dueDate": "05-02-2024",
+        "notes": "Paid by transfer",
+        "lineItems": [
+            {"description": "  Widget ", "quantity": 2, "unitPrice": 50.0, "lineTotal": 100},
+            {"description": "Shipping", "quantity": 1, "unitPrice": 0, "lineTotal": 0.0},
+        ],
+    }
+
+
+def _tolerant(data: dict, monkeypatch: pytest.MonkeyPatch) -> Invoice:
+    with monkeypatch.context() as m:
+        m.setattr(Invoice, "_construct_if_clean", classmethod(lambda cls, data: None))
+        return Invoice.model_validate_jsonish(data)
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda d: None,
+        lambda d: d.update(lineItems=[]),
+        lambda d: d.update(dueDate=None, notes=None),
+        lambda d: d.pop("currency"),
+    ],
+)
+def test_fast_path_matches_tolerant_path(edit, monkeypatch):
+    data = _clean()
+    edit(data)
+    fast = Invoice.model_validate_jsonish(copy.deepcopy(data))
+    slow = _tolerant(copy.deepcopy(data), monkeypatch)
+    assert fast.model_dump() == slow.model_dump()
+    assert fast.model_dump(mode="json") == slow.model_dump(mode="json")
+
+
+def _normalized() -> dict:
+    data = _clean()
+    data["invoiceDate"] = date(2024, 1, 5)
+    data["dueDate"] = date(2024, 2, 5)
+    return data
+
+
+def test_fast_path_taken_on_clean_input():
+    assert Invoice._construct_if_clean(_normalized()) is not None
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda d: d.update(total="121.00"),
+        lambda d: d["lineItems"][0].update(unitPrice="50"),
+        lambda d: d.update(tax=-1.0),
+        lambda d: d["lineItems"][1].update(quantity=-1),
+        lambda d: d.update(subtotal=float("nan")),
+        lambda d: d["lineItems"][0].update(lineTotal=float("nan")),
+        lambda d: d.update(tax=True),
+        lambda d: d["lineItems"][1].update(quantity=False),
+        lambda d: d["lineItems"][0].update(description="   "),
+        lambda d: d["lineItems"][0].update(description=""),
+    ],
+)
+def test_fast_path_rejects_unclean_input(edit):
+    data = _normalized()
+    edit(data)
+    assert Invoice._construct_if_clean(data) is None
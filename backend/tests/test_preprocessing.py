@@ -0,0 +1,40 @@
+from app.pipeline.preprocessing import sanitize_for_llm
+
+
+def test_stamp_glued_to_confidential_removes_both():
+    # The stamp removal exposes the word boundary after "Confidential"
+    text = "a\nConfidentialInvoice scanned by XYZ\nB"
+    assert sanitize_for_llm(text, 1000, 0, 0) == "a\nB"
+
+
+def test_page_glued_to_stamp_is_kept():
+    # "Page" runs before the stamp, when "4I" is not yet a word boundary
+    text = "a\npage 12 of 4Invoice scanned by XYZ\nB"
+    assert sanitize_for_llm(text, 1000, 0, 0) == "a\npage 12 of 4\nB"
+
+
+# max_chars is floored at 1000, so the truncation cases use that limit
+def test_text_of_exactly_max_chars_is_kept():
+    text = "a" * 499 + "\n" + "b" * 500
+    assert sanitize_for_llm(text, 1000, 0, 0) == text
+
+
+def test_newline_at_max_chars_cuts_at_previous_newline():
+    # The joined text has a newline exactly at index 1000; the cut lands on the one before it
+    text = "a" * 500 + "\n" + "b" * 499 + "\n" + "c" * 10
+    assert sanitize_for_llm(text, 1000, 0, 0) == "a" * 500
+
+
+def test_newline_at_max_chars_after_single_line_cuts_hard():
+    text = "a" * 1000 + "\n" + "b" * 10
+    assert sanitize_for_llm(text, 1000, 0, 0) == "a" * 1000
+
+
+def test_newline_just_before_max_chars_keeps_line():
+    text = "a" * 999 + "\n" + "b" * 10
+    assert sanitize_for_llm(text, 1000, 0, 0) == "a" * 999
+
+
+def test_single_line_longer_than_max_chars_cuts_hard():
+    assert sanitize_for_llm("x" * 1500, 1000, 0, 0) == "x" * 1000
+    assert sanitize_for_llm("x" * 1500 + "\ny", 1000, 0, 0) == "x" * 1000